@@ -9,8 +9,64 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
+
+class StreamingASGIHandler(ASGIHandler):
+    """Django's ASGI handler, reading streamed content off the event loop.
+
+    Django 3.2 iterates streaming responses on the event loop, where the
+    export's database queries are not allowed. Each chunk is pulled in
+    Django's sync thread, on its usual connection, and sent before the
+    next is read, so an export's memory stays bounded.
+    """
+
+    async def send_response(self, response, send):
+        """Send a response, pulling streamed chunks in the sync thread."""
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((
+                b'Set-Cookie',
+                cookie.output(header='').encode('ascii').strip(),
+            ))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await next_part(parts, None)
+            if part is None:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    """Set up Django and return the ASGI handler."""
+    django.setup(set_prefix=False)
+    return StreamingASGIHandler()
+
+
 application = get_asgi_application()
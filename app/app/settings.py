@@ -43,8 +43,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
-    'rest_framework.authtoken',
     'drf_spectacular',
     'core',
     'user',
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -85,16 +86,83 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections are kept for DB_CONN_MAX_AGE seconds and checked before
+# reuse. Behind pgbouncer in transaction mode, set
+# DB_DISABLE_SERVER_SIDE_CURSORS=1.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 0))
+        ),
+    }
+}
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The local-memory default is per process. Point CACHE_BACKEND at a shared
+# backend (e.g. memcached, as docker-compose-deploy.yml does) when running
+# more than one worker so that invalidations reach every process.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Responses are only cached when the cache is shared by every worker,
+# unless RESPONSE_CACHE_ENABLED is set to 1 or 0.
+RESPONSE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'ENABLED': (
+        bool(int(os.environ['RESPONSE_CACHE_ENABLED']))
+        if os.environ.get('RESPONSE_CACHE_ENABLED') else None
+    ),
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 3600)),
+}
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+
+# New passwords are hashed with PASSWORD_HASHER, argon2 or pbkdf2. The
+# other hashers still verify older passwords, which are rehashed with
+# the preferred one, and its current costs, on the next login.
+PASSWORD_HASHERS = {
+    'argon2': [
+        'core.hashers.Argon2PasswordHasher',
+        'core.hashers.PBKDF2PasswordHasher',
+    ],
+    'pbkdf2': [
+        'core.hashers.PBKDF2PasswordHasher',
+        'core.hashers.Argon2PasswordHasher',
+    ],
+}[os.environ.get('PASSWORD_HASHER', 'argon2')] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 19456)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 1)),
+    'PBKDF2_ITERATIONS': int(os.environ.get('PBKDF2_ITERATIONS', 260000)),
+}
+
+AUTHENTICATION_BACKENDS = ['core.authentication.TimingSafeModelBackend']
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -144,6 +212,95 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.environ.get('THROTTLE_READ_RATE', '600/min'),
+        'write': os.environ.get('THROTTLE_WRITE_RATE', '120/min'),
+        'upload': os.environ.get('THROTTLE_UPLOAD_RATE', '20/min'),
+        'login': os.environ.get('THROTTLE_LOGIN_RATE', '10/min'),
+    },
+    # The proxy overwrites X-Forwarded-For with the client address, so
+    # the last entry is the only one that can be trusted.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
+}
+
+# Throttle buckets are per worker process, except for SHARED_SCOPES,
+# which are counted atomically in the CACHE_ALIAS cache. With the
+# local-memory default cache that is per process too, so the effective
+# login limit is the rate times the number of workers until
+# CACHE_BACKEND points at a cache the workers share.
+THROTTLE_STORE = {
+    'SHARDS': int(os.environ.get('THROTTLE_STORE_SHARDS', 16)),
+    'MAX_SIZE': int(os.environ.get('THROTTLE_STORE_SIZE', 100000)),
+    'CACHE_ALIAS': os.environ.get('THROTTLE_CACHE_ALIAS', 'default'),
+    'SHARED_SCOPES': os.environ.get(
+        'THROTTLE_SHARED_SCOPES',
+        'login',
+    ).split(','),
+}
+
+RECIPE_IMAGE_UPLOAD = {
+    'MAX_BYTES': int(os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10485760)),
+    'MAX_PIXELS': int(os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40000000)),
+    'FORMATS': ['JPEG', 'PNG', 'WEBP', 'GIF'],
+}
+
+IMAGE_RENDITIONS = {
+    'SIZES': {'small': 320, 'large': 1280},
+    'WORKERS': int(os.environ.get('IMAGE_WORKERS', 2)),
+    'EAGER': bool(int(os.environ.get('IMAGE_RENDITIONS_EAGER', 0))),
+}
+
+AUTH_TOKEN = {
+    'TTL': int(os.environ.get('AUTH_TOKEN_TTL', 7 * 24 * 3600)),
+    'ROTATION_GRACE': int(os.environ.get('AUTH_TOKEN_ROTATION_GRACE', 60)),
+}
+
+# Token lookups are cached in CACHE_ALIAS when CACHE_BACKEND is shared
+# by the workers, so deleted tokens and deactivated users are rejected
+# at once. With the local-memory default, each worker keeps its own
+# cache, and such changes only reach the other workers after TIMEOUT
+# seconds.
+AUTH_TOKEN_CACHE = {
+    'MAX_SIZE': int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000)),
+    'TIMEOUT': int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 60)),
+    'CACHE_ALIAS': os.environ.get('AUTH_TOKEN_CACHE_ALIAS', 'default'),
+}
+
+# Metrics are counted per worker process. With a DIRECTORY, each worker
+# writes its counts there every FLUSH_SECONDS, and /api/metrics/ serves
+# the sum over all workers. Requests slower than SLOW_REQUEST_SECONDS
+# are logged with their slowest queries. Without a TOKEN, /api/metrics/
+# is only served in DEBUG.
+METRICS = {
+    'SLOW_REQUEST_SECONDS': float(
+        os.environ.get('METRICS_SLOW_REQUEST_SECONDS', 1),
+    ),
+    'TOKEN': os.environ.get('METRICS_TOKEN') or None,
+    'DIRECTORY': os.environ.get('METRICS_DIRECTORY') or None,
+    'FLUSH_SECONDS': float(os.environ.get('METRICS_FLUSH_SECONDS', 1)),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.metrics': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
 SPECTACULAR_SETTINGS = {
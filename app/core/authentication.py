@@ -0,0 +1,287 @@
+"""
+Authentication classes for the APIs.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+from django.utils.translation import gettext as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.caches import (
+    SharedCacheMixin,
+    is_shared,
+)
+from core.metrics import metrics
+from core.models import AuthToken
+from core.options import get_options
+
+
+class TokenCache(SharedCacheMixin):
+    """Bounded LRU cache of token keys to (user, token) pairs.
+
+    Entries live in process memory and expire after ``timeout`` seconds,
+    so a token deleted through another worker keeps working there until
+    then. When ``cache_alias`` names a Django cache, entries live only in
+    that cache instead, so that every worker sees each invalidation at
+    the cost of a cache round trip per lookup.
+    """
+    key_prefix = 'auth-token'
+
+    def __init__(self, max_size=10000, timeout=60, cache_alias=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+
+    def _shared_key(self, key):
+        """Return the shared cache key for a token key."""
+        return f'{self.key_prefix}:{key}'
+
+    def get(self, key):
+        """Return the cached (user, token) pair for a key, or None."""
+        if self.shared is not None:
+            value = self.shared.get(self._shared_key(key))
+            with self._lock:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.shared_hits += 1
+            return value
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            self._entries.pop(key, None)
+
+        return None
+
+    def set(self, key, value):
+        """Cache the (user, token) pair for a key."""
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, self.timeout)
+            return
+
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+    def _store(self, key, value, now):
+        """Add an entry to the local cache, evicting the oldest if full."""
+        self._entries[key] = (now + self.timeout, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, *keys):
+        """Remove keys from the local and shared caches."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """Remove every local entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.shared_hits = self.evictions = 0
+
+    def stats(self):
+        """Return cache counters."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def _token_cache_from_settings():
+    """Create the token cache from the AUTH_TOKEN_CACHE setting.
+
+    The ``CACHE_ALIAS`` cache is only used when every worker shares it.
+    """
+    options = get_options('AUTH_TOKEN_CACHE')
+    cache_alias = options.get('CACHE_ALIAS')
+    if cache_alias is not None and not is_shared(cache_alias):
+        cache_alias = None
+    return TokenCache(
+        max_size=options.get('MAX_SIZE', 10000),
+        timeout=options.get('TIMEOUT', 60),
+        cache_alias=cache_alias,
+    )
+
+
+token_cache = _token_cache_from_settings()
+
+metrics.add_counter(
+    'auth_token_cache_hits_total',
+    'Token lookups served from the local cache.',
+    lambda: token_cache.hits,
+)
+metrics.add_counter(
+    'auth_token_cache_shared_hits_total',
+    'Token lookups served from the shared cache.',
+    lambda: token_cache.shared_hits,
+)
+metrics.add_counter(
+    'auth_token_cache_misses_total',
+    'Token lookups that queried the database.',
+    lambda: token_cache.misses,
+)
+metrics.add_counter(
+    'auth_token_cache_evictions_total',
+    'Tokens dropped from the full local cache.',
+    lambda: token_cache.evictions,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches token lookups.
+
+    Expiry is checked on the token loaded with the user, cached or not,
+    so expired tokens are rejected without another query.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        """Return the user and token for a key, using the cache."""
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            if not token.is_expired:
+                token_cache.set(key, (user, token))
+        else:
+            user, token = (copy.copy(obj) for obj in cached)
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed(
+                    _('User inactive or deleted.')
+                )
+
+        if token.is_expired:
+            token_cache.delete(key)
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        return (user, token)
+
+
+class PasswordTimer:
+    """Moving average of how long password checks take."""
+
+    def __init__(self, weight=0.05):
+        self.weight = weight
+        self.average = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """Add the duration of a password check to the average."""
+        with self._lock:
+            if self.average is None:
+                self.average = seconds
+            else:
+                self.average += self.weight * (seconds - self.average)
+
+    def wait(self, password):
+        """Take as long as a password check, without doing one.
+
+        Until a check has been timed, the password is hashed once to
+        measure it, as Django does for every unknown user.
+        """
+        average = self.average
+        if average is None:
+            start = time.perf_counter()
+            get_user_model()().set_password(password)
+            self.record(time.perf_counter() - start)
+            return
+
+        time.sleep(average)
+
+
+password_timer = PasswordTimer()
+
+
+class TimingSafeModelBackend(ModelBackend):
+    """Model backend that does not hash passwords for unknown emails.
+
+    Django hashes the given password when no user matches, so that
+    failed lookups take as long as real ones, which lets anyone burn a
+    hash worth of CPU per request. This backend sleeps for the average
+    duration of recent password checks instead.
+    """
+
+    def authenticate(self, request, username=None, password=None,
+                     **kwargs):
+        """Return the user for an email and password, or None."""
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            password_timer.wait(password)
+            return None
+
+        start = time.perf_counter()
+        valid = user.check_password(password)
+        password_timer.record(time.perf_counter() - start)
+        if valid and self.user_can_authenticate(user):
+            return user
+
+        return None
+
+
+@receiver(post_delete, sender=AuthToken)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Remove a deleted token from the cache."""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=AuthToken)
+def evict_saved_token(sender, instance, created, **kwargs):
+    """Remove a changed token, such as a rotated one, from the cache."""
+    if not created:
+        token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def evict_saved_user_tokens(sender, instance, created, **kwargs):
+    """Remove every cached token of a changed user.
+
+    Cached tokens carry a copy of their user, so any save, such as a
+    profile update made with another of the user's tokens, evicts them
+    from the local and shared caches.
+    """
+    if created:
+        return
+
+    keys = AuthToken.objects.filter(
+        user=instance,
+    ).values_list('key', flat=True)
+    token_cache.delete(*keys)
@@ -0,0 +1,54 @@
+"""
+PostgreSQL backend with health checks for persistent connections.
+"""
+from django.db.backends.postgresql import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection checked before its first use in a request.
+
+    With ``CONN_HEALTH_CHECKS`` set, a persistent connection reused by a
+    new request is tested with a trivial query before the request's
+    first cursor, and replaced if the server, a pooler or the network
+    dropped it. Requests that never touch the database skip the check.
+    This follows the option of the same name in Django 4.1.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        """Return whether connections are checked before reuse."""
+        return bool(self.settings_dict.get('CONN_HEALTH_CHECKS'))
+
+    def connect(self):
+        """Open a connection, which needs no check until it is reused."""
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it is no longer usable."""
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+        ):
+            return
+
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def close_if_unusable_or_obsolete(self):
+        """Close a broken or expired connection, and check the next use.
+
+        Django calls this as each request starts and finishes.
+        """
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
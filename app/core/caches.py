@@ -0,0 +1,28 @@
+"""
+Helpers for the Django caches.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# Backends whose entries are not seen by other worker processes.
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias):
+    """Return whether a cache is shared by every worker process."""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+class SharedCacheMixin:
+    """Give access to the Django cache named by ``cache_alias``, if any."""
+    cache_alias = None
+
+    @property
+    def shared(self):
+        """Return the shared Django cache, if one is configured."""
+        if self.cache_alias is None:
+            return None
+
+        return caches[self.cache_alias]
@@ -0,0 +1,41 @@
+"""
+Password hashers with costs taken from settings.
+"""
+from django.contrib.auth import hashers
+
+from core.options import get_options
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id with the time, memory and parallelism from settings.
+
+    Hashes made with other parameters are rehashed on the next login.
+    """
+
+    @property
+    def time_cost(self):
+        return get_options('PASSWORD_HASHING').get('ARGON2_TIME_COST', 2)
+
+    @property
+    def memory_cost(self):
+        return get_options('PASSWORD_HASHING').get(
+            'ARGON2_MEMORY_COST', 19456,
+        )
+
+    @property
+    def parallelism(self):
+        return get_options('PASSWORD_HASHING').get('ARGON2_PARALLELISM', 1)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count from settings.
+
+    Hashes made with other counts are rehashed on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return get_options('PASSWORD_HASHING').get(
+            'PBKDF2_ITERATIONS',
+            hashers.PBKDF2PasswordHasher.iterations,
+        )
@@ -0,0 +1,243 @@
+"""
+Bulk loading of recipes.
+"""
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils import timezone
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.cache import bump_version
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+RECIPE_FIELDS = ['title', 'description', 'time_minutes', 'price', 'link']
+
+
+def loads(line):
+    """Parse a line of JSON."""
+    if orjson is not None:
+        return orjson.loads(line)
+
+    return json.loads(line)
+
+
+def read_ndjson(file):
+    """Yield (line number, record) for each line of an NDJSON file."""
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            yield number, loads(line)
+
+
+def read_csv(file):
+    """Yield (line number, record) for each row of a CSV file.
+
+    Tags and ingredients are semicolon separated names, as exported.
+    """
+    reader = csv.DictReader(file)
+    for row in reader:
+        for name in ('tags', 'ingredients'):
+            row[name] = [item for item in row.get(name, '').split(';') if item]
+        yield reader.line_num, row
+
+
+class NameResolver:
+    """Map names to ids of a user's tags or ingredients, in memory.
+
+    Existing names are loaded once, and missing ones are created with a
+    single insert per call. Created ids are cached, so a resolver should
+    not outlive a transaction that is rolled back.
+    """
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = dict(
+            model.objects.filter(user=user).values_list('name', 'id')
+        )
+        self.created = 0
+
+    def resolve(self, names):
+        """Return ids for names, creating the missing objects."""
+        missing = [name for name in dict.fromkeys(names)
+                   if name not in self.ids]
+        if missing:
+            self.model.objects.bulk_create(
+                [self.model(user=self.user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            self.ids.update(
+                self.model.objects.filter(
+                    user=self.user,
+                    name__in=missing,
+                ).values_list('name', 'id')
+            )
+            self.created += len(missing)
+
+        return [self.ids[name] for name in names]
+
+
+class RecipeImporter:
+    """Insert recipes for a user with COPY, or with bulk_create.
+
+    With COPY, recipe ids are reserved from the sequence first so that
+    links can be written without reading the rows back. Model signals
+    do not run for either method, so the user's response cache is
+    invalidated once per batch.
+    """
+
+    def __init__(self, user, method='copy'):
+        self.user = user
+        self.method = method
+        self.tags = NameResolver(Tag, user)
+        self.ingredients = NameResolver(Ingredient, user)
+        self._fields = {
+            name: Recipe._meta.get_field(name) for name in RECIPE_FIELDS
+        }
+        self._name_field = Tag._meta.get_field('name')
+        self._valid_names = set()
+
+    def _names(self, items):
+        """Return names from a list of names or {'name': ...} objects.
+
+        Names repeat across records, so each is only validated once.
+        """
+        names = [
+            item['name'] if isinstance(item, dict) else item
+            for item in items or []
+        ]
+        for name in names:
+            if name not in self._valid_names:
+                self._name_field.clean(name, None)
+                self._valid_names.add(name)
+
+        return names
+
+    def clean(self, record):
+        """Return (values, tag names, ingredient names) for a record.
+
+        Raises ValidationError, keyed by field, for invalid records.
+        """
+        values = {}
+        errors = {}
+        for name, field in self._fields.items():
+            value = record.get(name)
+            if value is None and field.blank:
+                value = ''
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+        try:
+            tags = self._names(record.get('tags'))
+            ingredients = self._names(record.get('ingredients'))
+        except ValidationError as exc:
+            errors['tags/ingredients'] = exc.messages
+        if errors:
+            raise ValidationError(errors)
+
+        return values, tags, ingredients
+
+    def load(self, records):
+        """Insert cleaned records and their links, returning recipe ids."""
+        if not records:
+            return []
+
+        if self.method == 'copy':
+            ids = self._copy_recipes([values for values, _, _ in records])
+        else:
+            ids = [
+                recipe.id for recipe in Recipe.objects.bulk_create(
+                    Recipe(user=self.user, **values)
+                    for values, _, _ in records
+                )
+            ]
+
+        for resolver, through, field, index in (
+            (self.tags, Recipe.tags.through, 'tag_id', 1),
+            (self.ingredients, Recipe.ingredients.through,
+             'ingredient_id', 2),
+        ):
+            names = [record[index] for record in records]
+            obj_ids = resolver.resolve(
+                [name for items in names for name in items]
+            )
+            links = []
+            position = 0
+            for recipe_id, items in zip(ids, names):
+                links.extend(
+                    dict.fromkeys(
+                        (recipe_id, obj_id)
+                        for obj_id in obj_ids[position:position + len(items)]
+                    )
+                )
+                position += len(items)
+            self._insert_links(through, field, links)
+
+        bump_version(self.user.id)
+        return ids
+
+    def _reserve_ids(self, count):
+        """Return new ids from the recipe id sequence."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [Recipe._meta.db_table, 'id', count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _copy(self, model, columns, rows):
+        """Load rows into a model's table with COPY."""
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {quote(model._meta.db_table)} '
+                f'({", ".join(quote(column) for column in columns)}) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+
+    def _copy_recipes(self, rows):
+        """Insert recipe values with COPY and return their ids."""
+        ids = self._reserve_ids(len(rows))
+        now = timezone.now().isoformat()
+        self._copy(
+            Recipe,
+            ['id', 'user_id', *RECIPE_FIELDS, 'image_renditions',
+             'created_at', 'updated_at', 'version'],
+            (
+                [recipe_id, self.user.id]
+                + [values[name] for name in RECIPE_FIELDS]
+                + ['{}', now, now, 1]
+                for recipe_id, values in zip(ids, rows)
+            ),
+        )
+        return ids
+
+    def _insert_links(self, through, field, links):
+        """Insert (recipe id, object id) pairs into a through table."""
+        if not links:
+            return
+
+        if self.method == 'copy':
+            self._copy(through, ['recipe_id', field], links)
+        else:
+            through.objects.bulk_create(
+                through(recipe_id=recipe_id, **{field: obj_id})
+                for recipe_id, obj_id in links
+            )
@@ -0,0 +1,7 @@
+"""
+Helpers for the benchmark commands.
+"""
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data."""
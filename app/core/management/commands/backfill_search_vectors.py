@@ -0,0 +1,52 @@
+"""
+Django command to fill in recipe search vectors.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import (
+    Recipe,
+    recipe_search_vector,
+)
+
+
+class Command(BaseCommand):
+    """Django command to backfill recipe search vectors."""
+    help = (
+        'Compute search vectors for recipes in primary key order, one '
+        'batch per transaction. Recipes saved after migration 0007 are '
+        'kept up to date by a database trigger.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute vectors that are already set.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        """Entrypoint for command."""
+        queryset = Recipe.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            total += queryset.filter(
+                id__gt=last_id,
+                id__lte=ids[-1],
+            ).update(search_vector=recipe_search_vector())
+            last_id = ids[-1]
+            self.stdout.write(f'Updated {total} recipes (up to id {last_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} recipes.'))
@@ -0,0 +1,104 @@
+"""
+Django command to measure recipe import throughput through the API.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import transaction
+
+from rest_framework.test import (
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from core.management.benchmarks import Rollback
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Django command to benchmark batch recipe imports."""
+    help = (
+        'Import recipes one request at a time and through the batch '
+        'endpoint, and report rows per second. All data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=3)
+        parser.add_argument('--ingredients', type=int, default=8)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            with transaction.atomic():
+                self._run(**options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _recipe(self, i, tags, ingredients):
+        """Return a recipe payload."""
+        return {
+            'title': f'Recipe {i}',
+            'time_minutes': 10 + i % 50,
+            'price': '5.00',
+            'tags': [{'name': f'Tag {j}'} for j in range(tags)],
+            'ingredients': [
+                {'name': f'Ingredient {(i + j) % 200}'}
+                for j in range(ingredients)
+            ],
+        }
+
+    def _run(self, rows, batch_size, tags, ingredients, **options):
+        """Time single and batch imports."""
+        user = get_user_model().objects.create_user(
+            email='import-benchmark@example.com',
+            password='benchmark',
+        )
+        factory = APIRequestFactory()
+        # Throttling would reject most of the requests, which then look
+        # like fast imports.
+        create_view = RecipeViewSet.as_view(
+            {'post': 'create'},
+            throttle_classes=[],
+        )
+        batch_view = RecipeViewSet.as_view(
+            {'post': 'batch'},
+            throttle_classes=[],
+        )
+
+        def post(view, data):
+            request = factory.post('/', data, format='json')
+            force_authenticate(request, user=user)
+            response = view(request)
+            statuses = [response.status_code] + [
+                result['status']
+                for result in response.data.get('results', [])
+            ]
+            failed = [code for code in statuses if not 200 <= code < 300]
+            if failed:
+                raise CommandError(
+                    f'Import request failed with status {failed[0]}.'
+                )
+            return response
+
+        start = time.perf_counter()
+        for i in range(rows):
+            post(create_view, self._recipe(i, tags, ingredients))
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            post(batch_view, {'operations': [
+                {'op': 'create', 'data': self._recipe(i, tags, ingredients)}
+                for i in range(offset, min(offset + batch_size, rows))
+            ]})
+        batch = time.perf_counter() - start
+
+        self.stdout.write(f'single: {rows / single:,.0f} rows/s')
+        self.stdout.write(f'batch:  {rows / batch:,.0f} rows/s')
@@ -0,0 +1,101 @@
+"""
+Django command to measure bulk recipe import throughput.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.test import APIRequestFactory
+
+from core.imports import RecipeImporter
+from core.management.benchmarks import Rollback
+from recipe.serializers import RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Django command to benchmark bulk recipe imports."""
+    help = (
+        'Import generated recipes one at a time through the serializer, '
+        'with bulk_create and with COPY, and report records per second. '
+        'All data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--serializer-rows', type=int, default=500)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=3)
+        parser.add_argument('--ingredients', type=int, default=8)
+
+    def _records(self, rows, tags, ingredients):
+        """Return records as read from an NDJSON dump."""
+        return [
+            {
+                'title': f'Recipe {i}',
+                'description': 'Mix everything and bake for an hour.',
+                'time_minutes': 10 + i % 50,
+                'price': f'{5 + i % 20}.25',
+                'link': 'https://example.com/recipe.pdf',
+                'tags': [{'name': f'Tag {j}'} for j in range(tags)],
+                'ingredients': [
+                    {'name': f'Ingredient {(i + j) % 200}'}
+                    for j in range(ingredients)
+                ],
+            }
+            for i in range(rows)
+        ]
+
+    def _time(self, func):
+        """Run func in a rolled back transaction, returning seconds."""
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    email='bulk-import-benchmark@example.com',
+                    password='benchmark',
+                )
+                func(user)
+                elapsed = time.perf_counter() - start
+                raise Rollback()
+        except Rollback:
+            pass
+
+        return elapsed
+
+    def handle(self, *args, rows, serializer_rows, batch_size, tags,
+               ingredients, **options):
+        """Entrypoint for command."""
+        records = self._records(rows, tags, ingredients)
+        sample = records[:serializer_rows]
+        request = APIRequestFactory().post('/')
+
+        def serializer_import(user):
+            request.user = user
+            for record in sample:
+                serializer = RecipeDetailSerializer(
+                    data=record,
+                    context={'request': request},
+                )
+                serializer.is_valid(raise_exception=True)
+                serializer.save(user=user)
+
+        def bulk_import(method):
+            def run(user):
+                importer = RecipeImporter(user, method=method)
+                for start in range(0, len(records), batch_size):
+                    importer.load([
+                        importer.clean(record)
+                        for record in records[start:start + batch_size]
+                    ])
+            return run
+
+        self.stdout.write(f'{"method":<12} {"records":>10} {"records/s":>12}')
+        for label, count, func in (
+            ('serializer', len(sample), serializer_import),
+            ('bulk_create', len(records), bulk_import('bulk')),
+            ('copy', len(records), bulk_import('copy')),
+        ):
+            rate = count / self._time(func)
+            self.stdout.write(f'{label:<12} {count:>10} {rate:>12.0f}')
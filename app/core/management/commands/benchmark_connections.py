@@ -0,0 +1,76 @@
+"""
+Django command to measure database connection reuse across requests.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import (
+    request_finished,
+    request_started,
+)
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to benchmark persistent database connections."""
+    help = (
+        'Simulate requests that each run one query, with a new connection '
+        'per request and with persistent connections, with and without '
+        'health checks. Report connections opened and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def _run(self, requests, max_age, health_checks):
+        """Return (connections opened, sorted latencies in ms)."""
+        opened = []
+
+        def count(sender, **kwargs):
+            opened.append(sender)
+
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+        connection_created.connect(count)
+        latencies = []
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                Recipe.objects.filter(id=0).exists()
+                request_finished.send(sender=self.__class__)
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection_created.disconnect(count)
+            connection.close()
+
+        return len(opened), sorted(latencies)
+
+    def handle(self, *args, requests, **options):
+        """Entrypoint for command."""
+        original = dict(connection.settings_dict)
+        self.stdout.write(
+            f'{"mode":<26} {"connects":>9} {"mean ms":>8} {"p50 ms":>7} '
+            f'{"p99 ms":>7}'
+        )
+        try:
+            for label, max_age, health_checks in (
+                ('new connection', 0, False),
+                ('persistent', 60, False),
+                ('persistent, health checks', 60, True),
+            ):
+                opened, latencies = self._run(requests, max_age, health_checks)
+                mean = sum(latencies) / len(latencies)
+                p50 = latencies[len(latencies) // 2]
+                p99 = latencies[min(len(latencies) - 1,
+                                    len(latencies) * 99 // 100)]
+                self.stdout.write(
+                    f'{label:<26} {opened:>9} {mean:>8.2f} {p50:>7.2f} '
+                    f'{p99:>7.2f}'
+                )
+        finally:
+            connection.settings_dict.update(original)
@@ -0,0 +1,91 @@
+"""
+Django command to compare memory use of recipe image upload parsing.
+"""
+import io
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from django.core.management.base import BaseCommand
+from django.test.client import (
+    BOUNDARY,
+    MULTIPART_CONTENT,
+    RequestFactory,
+    encode_multipart,
+)
+
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+
+from recipe.uploads import RecipeImageParser
+
+
+class Command(BaseCommand):
+    """Django command to benchmark concurrent image upload parsing."""
+    help = (
+        'Parse concurrent multipart image uploads with the default '
+        'handlers and the streaming recipe image handler, and report '
+        'throughput and peak traced memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=64)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--megapixels', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        body = self._body(options['megapixels'])
+        self.stdout.write(
+            f'Upload size: {len(body) / 1024 / 1024:.2f} MiB, '
+            f'{options["uploads"]} uploads, '
+            f'{options["concurrency"]} concurrent'
+        )
+        for name, parser_class in [
+            ('default', MultiPartParser),
+            ('streaming', RecipeImageParser),
+        ]:
+            elapsed, peak = self._run(parser_class, body, **options)
+            self.stdout.write(
+                f'{name:>10}: {options["uploads"] / elapsed:8.1f} uploads/s'
+                f'  peak {peak / 1024 / 1024:8.2f} MiB'
+            )
+
+    def _body(self, megapixels):
+        """Return a multipart body holding a hard to compress JPEG."""
+        side = int((megapixels * 1000 * 1000) ** 0.5)
+        pixels = os.urandom(side * side * 3)
+        image = Image.frombytes('RGB', (side, side), pixels)
+        content = io.BytesIO()
+        image.save(content, 'JPEG', quality=95)
+        content.name = 'upload.jpg'
+        content.seek(0)
+
+        return encode_multipart(BOUNDARY, {'image': content})
+
+    def _parse(self, parser_class, body):
+        """Parse a single upload and discard the files."""
+        factory_request = RequestFactory().generic(
+            'POST', '/', body, content_type=MULTIPART_CONTENT,
+        )
+        request = Request(factory_request, parsers=[parser_class()])
+        for uploaded in request.FILES.values():
+            uploaded.close()
+
+    def _run(self, parser_class, body, uploads, concurrency, **options):
+        """Return elapsed seconds and peak traced memory for a run."""
+        tracemalloc.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(
+                lambda _: self._parse(parser_class, body),
+                range(uploads),
+            ))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return elapsed, peak
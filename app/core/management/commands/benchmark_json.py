@@ -0,0 +1,104 @@
+"""
+Django command to compare the JSON renderers and parsers.
+"""
+import io
+import time
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    """Django command to benchmark JSON rendering and parsing."""
+    help = (
+        'Render and parse recipe list payloads with DRF\'s JSON classes '
+        'and the orjson ones, and report throughput.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=3)
+        parser.add_argument('--ingredients', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _payload(self, rows, tags, ingredients):
+        """Return a page of recipes as returned by the recipe list."""
+        return {
+            'next': 'http://localhost/api/recipe/recipes/?cursor=cD0xMDA%3D',
+            'previous': None,
+            'results': [
+                {
+                    'id': i,
+                    'title': f'Recipe {i} with crème fraîche',
+                    'time_minutes': 10 + i % 50,
+                    'price': f'{5 + i % 20}.25',
+                    'link': 'https://example.com/recipe.pdf',
+                    'tags': [
+                        {'id': j, 'name': f'Tag {j}'} for j in range(tags)
+                    ],
+                    'ingredients': [
+                        {'id': j, 'name': f'Ingredient {j}'}
+                        for j in range(ingredients)
+                    ],
+                    'image_renditions': {
+                        'small_jpg': (
+                            'http://localhost/static/media/uploads/recipe/'
+                            f'renditions/{i}-small_jpg.jpg'
+                        ),
+                    },
+                }
+                for i in range(rows)
+            ],
+        }
+
+    def handle(self, *args, rows, tags, ingredients, repeat, **options):
+        """Entrypoint for command."""
+        data = self._payload(rows, tags, ingredients)
+        body = JSONRenderer().render(data)
+        self.stdout.write(
+            f'Payload: {rows} recipes, {len(body) / 1024:.0f} KiB'
+        )
+        self.stdout.write(
+            f'{"":<10} {"drf ms":>10} {"orjson ms":>10} {"speedup":>8}'
+        )
+        for label, drf_func, fast_func in (
+            (
+                'render',
+                lambda: JSONRenderer().render(data),
+                lambda: ORJSONRenderer().render(data),
+            ),
+            (
+                'stream',
+                lambda: JSONRenderer().render(data['results']),
+                lambda: b''.join(
+                    ORJSONRenderer().iter_render(data['results'])
+                ),
+            ),
+            (
+                'parse',
+                lambda: JSONParser().parse(io.BytesIO(body)),
+                lambda: ORJSONParser().parse(io.BytesIO(body)),
+            ),
+        ):
+            drf_ms = self._time(drf_func, repeat)
+            fast_ms = self._time(fast_func, repeat)
+            self.stdout.write(
+                f'{label:<10} {drf_ms:>10.2f} {fast_ms:>10.2f} '
+                f'{drf_ms / fast_ms:>7.1f}x'
+            )
+
+    def _time(self, func, repeat):
+        """Return the best time of several runs in milliseconds."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best
@@ -0,0 +1,68 @@
+"""
+Django command to measure login throughput for each password hasher.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from core.authentication import TimingSafeModelBackend
+from core.management.benchmarks import Rollback
+
+
+class Command(BaseCommand):
+    """Django command to benchmark logins."""
+    help = (
+        'Log in with PBKDF2 and Argon2 hashed passwords, and with unknown '
+        'emails, and report logins per second per core from CPU time. '
+        'All data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50)
+
+    def _time(self, backend, email, logins):
+        """Return (CPU seconds, wall seconds) for logins."""
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        for _ in range(logins):
+            backend.authenticate(None, username=email, password='benchmark')
+
+        return time.process_time() - cpu, time.perf_counter() - wall
+
+    def handle(self, *args, logins, **options):
+        """Entrypoint for command."""
+        backend = TimingSafeModelBackend()
+        hashers = {
+            'pbkdf2_sha256': 'core.hashers.PBKDF2PasswordHasher',
+            'argon2': 'core.hashers.Argon2PasswordHasher',
+        }
+        self.stdout.write(
+            f'{"login":<16} {"logins/s/core":>14} {"ms wall":>8}'
+        )
+        try:
+            with transaction.atomic():
+                for algorithm, path in hashers.items():
+                    email = f'{algorithm}@example.com'
+                    # Prefer the hasher, so logins do not rehash.
+                    with override_settings(PASSWORD_HASHERS=[path]):
+                        get_user_model().objects.create_user(
+                            email=email,
+                            password='benchmark',
+                        )
+                        cpu, wall = self._time(backend, email, logins)
+                    self._report(algorithm, logins, cpu, wall)
+
+                cpu, wall = self._time(backend, 'unknown@example.com', logins)
+                self._report('unknown email', logins, cpu, wall)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _report(self, label, logins, cpu, wall):
+        """Write a result row."""
+        self.stdout.write(
+            f'{label:<16} {logins / cpu:>14.0f} {wall / logins * 1000:>8.1f}'
+        )
@@ -0,0 +1,91 @@
+"""
+Django command to compare offset and keyset pagination of recipes.
+"""
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.management.benchmarks import Rollback
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe pagination."""
+    help = (
+        'Seed recipes inside a transaction and time fetching pages by '
+        'offset and by keyset. All data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            with transaction.atomic():
+                self._run(**options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, rows, page_size, batch_size, repeat, **options):
+        """Seed data and print timings for a range of page depths."""
+        user = get_user_model().objects.create_user(
+            email='pagination-benchmark@example.com',
+            password='benchmark',
+        )
+        self.stdout.write(f'Seeding {rows} recipes...')
+        for start in range(0, rows, batch_size):
+            Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_minutes=10,
+                    price=Decimal('5.00'),
+                )
+                for i in range(start, min(start + batch_size, rows))
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Recipe._meta.db_table}')
+
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        ids = list(queryset.values_list('id', flat=True))
+        self.stdout.write(
+            f'{"offset":>10} {"offset ms":>12} {"keyset ms":>12}'
+        )
+        offset = 0
+        while offset < rows:
+            cursor_id = ids[offset - 1] if offset else None
+            offset_ms = self._time(
+                lambda: list(queryset[offset:offset + page_size]),
+                repeat,
+            )
+            keyset_ms = self._time(
+                lambda: list(
+                    queryset.filter(id__lt=cursor_id)[:page_size]
+                    if cursor_id else queryset[:page_size]
+                ),
+                repeat,
+            )
+            self.stdout.write(
+                f'{offset:>10} {offset_ms:>12.2f} {keyset_ms:>12.2f}'
+            )
+            offset = offset * 10 if offset else page_size
+
+    def _time(self, func, repeat):
+        """Return the best time of several runs in milliseconds."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best
@@ -0,0 +1,157 @@
+"""
+Django command to compare model and fast-path recipe serialization.
+"""
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from rest_framework.test import APIRequestFactory
+
+from core.management.benchmarks import Rollback
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.fastpath import ValuesSerializer
+from recipe.serializers import (
+    IngredientSerializer,
+    RecipeSerializer,
+    TagSerializer,
+)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe serialization."""
+    help = (
+        'Seed recipes inside a transaction and report objects per second '
+        'serialized by the DRF serializers and by the fast path, with and '
+        'without the queries. All data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=3)
+        parser.add_argument('--ingredients', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            with transaction.atomic():
+                self._run(**options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _seed(self, rows, tags, ingredients):
+        """Create recipes linked to tags and ingredients."""
+        user = get_user_model().objects.create_user(
+            email='serializer-benchmark@example.com',
+            password='benchmark',
+        )
+        tag_objs = Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(tags * 10)
+        )
+        ingredient_objs = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'Ingredient {i}')
+            for i in range(ingredients * 10)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=10 + i % 50,
+                price=Decimal('5.25'),
+                link='https://example.com/recipe',
+            )
+            for i in range(rows)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(
+                recipe_id=recipe.id,
+                tag_id=tag_objs[(i + j) % len(tag_objs)].id,
+            )
+            for i, recipe in enumerate(recipes)
+            for j in range(tags)
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient_objs[
+                    (i + j) % len(ingredient_objs)
+                ].id,
+            )
+            for i, recipe in enumerate(recipes)
+            for j in range(ingredients)
+        )
+
+    def _run(self, rows, tags, ingredients, repeat, **options):
+        """Seed data and print objects per second for each path."""
+        self.stdout.write(f'Seeding {rows} recipes...')
+        self._seed(rows, tags, ingredients)
+        context = {'request': APIRequestFactory().get('/')}
+
+        self.stdout.write(
+            f'{"serializer":<26} {"drf obj/s":>12} {"fast obj/s":>12} '
+            f'{"speedup":>8}'
+        )
+        for label, serializer_class, queryset, relations in (
+            ('Recipe', RecipeSerializer, Recipe.objects.order_by('-id'),
+             ['tags', 'ingredients']),
+            ('Tag', TagSerializer, Tag.objects.order_by('-name'), []),
+            ('Ingredient', IngredientSerializer,
+             Ingredient.objects.order_by('-name'), []),
+        ):
+            fast = ValuesSerializer(serializer_class(context=context))
+            count = queryset.count()
+
+            def drf_end_to_end():
+                objs = list(queryset)
+                prefetch_related_objects(objs, *relations)
+                return serializer_class(objs, many=True, context=context).data
+
+            def fast_end_to_end():
+                return fast.serialize(queryset.values(*fast.columns))
+
+            objs = list(queryset)
+            prefetch_related_objects(objs, *relations)
+            values = list(queryset.values(*fast.columns))
+            related = {
+                name: load([row['id'] for row in values])
+                for name, load in fast.relations.items()
+            }
+            for suffix, drf_func, fast_func in (
+                (
+                    'serialize only',
+                    lambda: serializer_class(
+                        objs, many=True, context=context,
+                    ).data,
+                    lambda: [
+                        fast.to_representation(row, related)
+                        for row in values
+                    ],
+                ),
+                ('with queries', drf_end_to_end, fast_end_to_end),
+            ):
+                drf_rate = count / self._time(drf_func, repeat)
+                fast_rate = count / self._time(fast_func, repeat)
+                self.stdout.write(
+                    f'{label + " " + suffix:<26} {drf_rate:>12.0f} '
+                    f'{fast_rate:>12.0f} {fast_rate / drf_rate:>7.1f}x'
+                )
+
+    def _time(self, func, repeat):
+        """Return the best time of several runs in seconds."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best
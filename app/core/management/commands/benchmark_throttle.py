@@ -0,0 +1,110 @@
+"""
+Django command to measure the overhead of throttling a request.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import UserRateThrottle
+
+from core.throttling import (
+    TokenBucketStore,
+    TokenBucketThrottle,
+)
+
+
+RATE = '1000000/s'
+
+
+class LocalThrottle(TokenBucketThrottle):
+    """Token bucket throttle with its own in-process store."""
+    store = TokenBucketStore()
+
+
+class SharedThrottle(TokenBucketThrottle):
+    """Token bucket throttle storing buckets in the default cache."""
+    store = TokenBucketStore(cache_alias='default')
+
+
+class DRFThrottle(UserRateThrottle):
+    """DRF's sliding window throttle, storing history in the cache."""
+    THROTTLE_RATES = {'user': RATE}
+
+
+class Command(BaseCommand):
+    """Django command to benchmark throttle checks."""
+    help = (
+        'Time allow_request for the token bucket throttle, in process and '
+        'with a shared cache, against DRF\'s UserRateThrottle, for '
+        'requests spread over many users.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=4)
+
+    def _requests(self, users):
+        """Return a GET request authenticated as each of the users."""
+        factory = APIRequestFactory()
+        user_model = get_user_model()
+        requests = []
+        for pk in range(1, users + 1):
+            request = Request(factory.get('/api/recipe/recipes/'))
+            request.user = user_model(pk=pk, email=f'user{pk}@example.com')
+            requests.append(request)
+
+        return requests
+
+    def _run(self, throttle_class, requests, count, threads):
+        """Return the mean microseconds per check over all threads."""
+        def check():
+            for i in range(count // threads):
+                request = requests[i % len(requests)]
+                throttle_class().allow_request(request, None)
+
+        workers = [threading.Thread(target=check) for _ in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        return elapsed / count * 1e6
+
+    def handle(self, *args, requests, users, threads, **options):
+        """Entrypoint for command."""
+        rest_framework = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'read': RATE},
+        }
+        caches['default'].clear()
+        self.stdout.write(
+            f'{requests} checks over {users} users, {threads} threads, '
+            f'cache {caches["default"].__class__.__name__}'
+        )
+        self.stdout.write(f'{"throttle":<22} {"us/check":>9}')
+        try:
+            with override_settings(REST_FRAMEWORK=rest_framework):
+                for label, throttle_class in (
+                    ('token bucket', LocalThrottle),
+                    ('token bucket, shared', SharedThrottle),
+                    ('drf UserRateThrottle', DRFThrottle),
+                ):
+                    micros = self._run(
+                        throttle_class,
+                        self._requests(users),
+                        requests,
+                        threads,
+                    )
+                    self.stdout.write(f'{label:<22} {micros:>9.2f}')
+        finally:
+            caches['default'].clear()
@@ -0,0 +1,64 @@
+"""
+Django command to export a user's recipes.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from core.models import Recipe
+from recipe.exports import (
+    CONTENT_TYPES,
+    iter_export,
+)
+from recipe.fastpath import ValuesSerializer
+from recipe.serializers import RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Django command to stream recipes to a file."""
+    help = (
+        'Export all recipes of a user as NDJSON, JSON or CSV, in id order. '
+        'Use --after with the last exported id to resume an export.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument(
+            '--format',
+            dest='export_format',
+            choices=list(CONTENT_TYPES),
+            default='ndjson',
+        )
+        parser.add_argument('--output', help='File to write, or stdout.')
+        parser.add_argument(
+            '--append',
+            action='store_true',
+            help='Append to the output file, for resumed exports.',
+        )
+        parser.add_argument('--after', type=int)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, email, export_format, output, append, after,
+               chunk_size, **options):
+        """Entrypoint for command."""
+        user = get_user_model().objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f'No user with email {email!r}.')
+
+        chunks = iter_export(
+            Recipe.objects.filter(user=user),
+            ValuesSerializer(RecipeDetailSerializer()),
+            export_format,
+            after=after,
+            chunk_size=chunk_size,
+        )
+        if output is None:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+
+        with open(output, 'ab' if append else 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
@@ -0,0 +1,138 @@
+"""
+Django command to bulk import recipes for a user.
+"""
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import transaction
+
+from core.imports import (
+    RecipeImporter,
+    read_csv,
+    read_ndjson,
+)
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from NDJSON or CSV."""
+    help = (
+        'Import recipes, with their tags and ingredients, from an NDJSON '
+        'or CSV dump in the export format. Each batch is committed in its '
+        'own transaction, and with --checkpoint an interrupted import '
+        'resumes after the last committed batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            dest='import_format',
+            choices=list(READERS),
+            help='Format of the file. Defaults to its extension.',
+        )
+        parser.add_argument(
+            '--method',
+            choices=['copy', 'bulk'],
+            default='copy',
+            help='Insert with COPY, or with bulk_create.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording how many records have been committed.',
+        )
+
+    def _read_checkpoint(self, checkpoint, path):
+        """Return the number of records already imported from path."""
+        if checkpoint is None or not os.path.exists(checkpoint):
+            return 0
+
+        with open(checkpoint) as file:
+            state = json.load(file)
+        if state['path'] != os.path.abspath(path):
+            raise CommandError(
+                f'Checkpoint {checkpoint} is for {state["path"]}.'
+            )
+
+        return state['records']
+
+    def _write_checkpoint(self, checkpoint, path, records):
+        """Record the number of records imported from path."""
+        if checkpoint is None:
+            return
+
+        partial = f'{checkpoint}.tmp'
+        with open(partial, 'w') as file:
+            json.dump(
+                {'path': os.path.abspath(path), 'records': records},
+                file,
+            )
+        os.replace(partial, checkpoint)
+
+    def handle(self, *args, email, path, import_format, method, batch_size,
+               checkpoint, **options):
+        """Entrypoint for command."""
+        user = get_user_model().objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f'No user with email {email!r}.')
+        if import_format is None:
+            import_format = os.path.splitext(path)[1].lstrip('.').lower()
+        if import_format not in READERS:
+            raise CommandError('Use --format to give the file format.')
+
+        done = self._read_checkpoint(checkpoint, path)
+        if done:
+            self.stdout.write(f'Resuming after {done} records.')
+
+        importer = RecipeImporter(user, method=method)
+        imported = 0
+        start = time.perf_counter()
+        with open(path, newline='', encoding='utf-8') as file:
+            records = islice(READERS[import_format](file), done, None)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+
+                cleaned = []
+                for line, record in batch:
+                    try:
+                        cleaned.append(importer.clean(record))
+                    except ValidationError as exc:
+                        raise CommandError(
+                            f'Invalid record on line {line}: '
+                            f'{exc.message_dict}'
+                        )
+                with transaction.atomic():
+                    importer.load(cleaned)
+
+                imported += len(batch)
+                self._write_checkpoint(checkpoint, path, done + imported)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'Imported {done + imported} records '
+                    f'({imported / elapsed:.0f} records/s)'
+                )
+
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes, created '
+            f'{importer.tags.created} tags and '
+            f'{importer.ingredients.created} ingredients.'
+        ))
@@ -0,0 +1,150 @@
+"""
+Django command to load test a running server.
+"""
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Django command to load test API endpoints over HTTP."""
+    help = (
+        'Send GET requests to the given URLs from concurrent keep-alive '
+        'connections, optionally while slow clients trickle request '
+        'bodies, and report throughput and latency percentiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('--token', help='Token for the Authorization.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=0,
+            help='Connections slowly uploading a body to the first URL.',
+        )
+        parser.add_argument(
+            '--slow-interval',
+            type=float,
+            default=0.5,
+            help='Seconds between each 1KB sent by slow clients.',
+        )
+
+    def _connect(self, url):
+        """Return a connection to the host of a URL."""
+        parts = urlsplit(url)
+        return http.client.HTTPConnection(parts.hostname, parts.port or 80)
+
+    def _path(self, url):
+        """Return the path and query of a URL."""
+        parts = urlsplit(url)
+        return parts.path + (f'?{parts.query}' if parts.query else '')
+
+    def _get(self, connection, path, headers):
+        """Send a GET and return the response after reading it."""
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response
+
+    def _client(self, urls, headers, deadline, latencies, errors):
+        """Send requests round robin until the deadline."""
+        connection = self._connect(urls[0])
+        paths = [self._path(url) for url in urls]
+        sent = 0
+        while time.monotonic() < deadline:
+            path = paths[sent % len(paths)]
+            sent += 1
+            start = time.perf_counter()
+            try:
+                response = self._get(connection, path, headers)
+            except (OSError, http.client.HTTPException):
+                # Servers without keep-alive close the connection after
+                # each response, so retry once on a new connection.
+                connection.close()
+                connection = self._connect(urls[0])
+                try:
+                    response = self._get(connection, path, headers)
+                except (OSError, http.client.HTTPException):
+                    errors.append(path)
+                    connection.close()
+                    connection = self._connect(urls[0])
+                    continue
+
+            if response.status >= 400:
+                errors.append(path)
+            else:
+                latencies.append(time.perf_counter() - start)
+        connection.close()
+
+    def _slow_client(self, url, headers, deadline, interval):
+        """Upload a body 1KB at a time until the deadline."""
+        chunk = b' ' * 1024
+        connection = self._connect(url)
+        try:
+            connection.putrequest('POST', self._path(url))
+            for name, value in headers.items():
+                connection.putheader(name, value)
+            connection.putheader('Content-Type', 'application/json')
+            connection.putheader('Content-Length', str(10 * 1024 * 1024))
+            connection.endheaders()
+            while time.monotonic() < deadline:
+                connection.send(chunk)
+                time.sleep(interval)
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def _percentile(self, values, percent):
+        """Return a percentile of sorted values."""
+        index = min(len(values) - 1, int(len(values) * percent / 100))
+        return values[index]
+
+    def handle(self, *args, urls, token, concurrency, duration,
+               slow_clients, slow_interval, **options):
+        """Entrypoint for command."""
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+
+        latencies = []
+        errors = []
+        start = time.monotonic()
+        deadline = start + duration
+        threads = [
+            threading.Thread(
+                target=self._slow_client,
+                args=(urls[0], headers, deadline, slow_interval),
+                daemon=True,
+            )
+            for _ in range(slow_clients)
+        ]
+        threads.extend(
+            threading.Thread(
+                target=self._client,
+                args=(urls, headers, deadline, latencies, errors),
+            )
+            for _ in range(concurrency)
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads[slow_clients:]:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        latencies = sorted(latency * 1000 for latency in latencies)
+        self.stdout.write(
+            f'{len(latencies)} requests in {elapsed:.1f}s, '
+            f'{len(errors)} errors, {len(latencies) / elapsed:.0f} req/s'
+        )
+        if latencies:
+            self.stdout.write(' '.join(
+                f'p{percent}={self._percentile(latencies, percent):.1f}ms'
+                for percent in (50, 95, 99)
+            ) + f' max={latencies[-1]:.1f}ms')
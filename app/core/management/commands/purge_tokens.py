@@ -0,0 +1,56 @@
+"""
+Django command to delete expired auth tokens.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import (
+    connection,
+    transaction,
+)
+
+from core.models import AuthToken
+
+
+class Command(BaseCommand):
+    """Django command to purge expired auth tokens."""
+    help = (
+        'Delete expired auth tokens in batches, one short transaction per '
+        'batch. Rows locked by other transactions are skipped and picked '
+        'up by the next run. Run it periodically, e.g. from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches.',
+        )
+
+    def _delete_batch(self, batch_size):
+        """Delete up to batch_size expired tokens and return the count."""
+        table = connection.ops.quote_name(AuthToken._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE key IN ('
+                f'SELECT key FROM {table} WHERE expires <= now() '
+                'LIMIT %s FOR UPDATE SKIP LOCKED)',
+                [batch_size],
+            )
+            return cursor.rowcount
+
+    def handle(self, *args, batch_size, sleep, **options):
+        """Entrypoint for command."""
+        total = 0
+        while True:
+            deleted = self._delete_batch(batch_size)
+            total += deleted
+            if deleted < batch_size:
+                break
+
+            self.stdout.write(f'Deleted {total} tokens')
+            time.sleep(sleep)
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {total} tokens.'))
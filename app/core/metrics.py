@@ -0,0 +1,461 @@
+"""
+Request metrics for the APIs, exposed in the Prometheus text format.
+"""
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import functools
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+from core.options import get_options
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+# Stats of the request being handled, for the serializer timing.
+current_stats = contextvars.ContextVar('current_stats', default=None)
+
+
+def fingerprint(sql):
+    """Return SQL with literals and parameter lists replaced by ?."""
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+
+    return sql.strip()
+
+
+def _escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+class Histogram:
+    """Histogram with one series per set of label values."""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values, amount):
+        """Add an observation to the series for a tuple of label values."""
+        index = bisect.bisect_left(self.buckets, amount)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                # Counts per bucket, then the +Inf count and the sum.
+                series = self._series[values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += amount
+
+    def snapshot(self):
+        """Return a copy of the counts of each series."""
+        with self._lock:
+            return {
+                values: list(counts)
+                for values, counts in self._series.items()
+            }
+
+    def render(self, series=None):
+        """Return the histogram as lines of the Prometheus text format.
+
+        ``series`` maps label values to counts, as ``snapshot`` returns,
+        and defaults to this histogram's own.
+        """
+        if series is None:
+            series = self.snapshot()
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for values, counts in sorted(series.items()):
+            labels = ','.join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labels, values)
+            )
+            prefix = f'{labels},' if labels else ''
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                lines.append(
+                    f'{self.name}_bucket{{{prefix}le="{bound}"}} {total}'
+                )
+            total += counts[-2]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {total}')
+            lines.append(f'{self.name}_sum{{{labels}}} {counts[-1]}')
+            lines.append(f'{self.name}_count{{{labels}}} {total}')
+
+        return lines
+
+    def clear(self):
+        """Remove every series."""
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Counter whose value is read from a function when collected."""
+
+    def __init__(self, name, documentation, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def snapshot(self):
+        """Return the current value, in the form of a histogram snapshot."""
+        return {(): [self.read()]}
+
+    def render(self, series=None):
+        """Return the counter as lines of the Prometheus text format."""
+        if series is None:
+            series = self.snapshot()
+        value = series.get((), [0])[0]
+
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter',
+            f'{self.name} {value}',
+        ]
+
+
+def _add_series(total, series):
+    """Add the counts of each series into a total of the same form."""
+    for values, counts in series.items():
+        current = total.get(values)
+        if current is None:
+            total[values] = list(counts)
+        else:
+            total[values] = [a + b for a, b in zip(current, counts)]
+
+
+class Metrics:
+    """Request metrics, aggregated over the worker processes.
+
+    Each process counts its own requests. When ``directory`` is set, it
+    writes its counts to a file there at most every ``flush_seconds``,
+    and rendering adds up the files of every process, including ones
+    that have exited, so that any worker can answer a scrape with the
+    totals. Without a directory only this process is counted.
+    """
+
+    def __init__(self, directory=None, flush_seconds=1):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._timer = None
+        self._flush_lock = threading.Lock()
+        self.request_duration = Histogram(
+            'http_request_duration_seconds',
+            'Time to handle requests.',
+            ('view', 'method', 'status'),
+            DURATION_BUCKETS,
+        )
+        self.db_queries = Histogram(
+            'http_request_db_queries',
+            'SQL queries run per request.',
+            ('view', 'method'),
+            QUERY_BUCKETS,
+        )
+        self.db_duration = Histogram(
+            'http_request_db_duration_seconds',
+            'Time spent in SQL queries per request.',
+            ('view', 'method'),
+            DURATION_BUCKETS,
+        )
+        self.serializer_duration = Histogram(
+            'http_request_serializer_duration_seconds',
+            'Time spent serializing rows and rendering data per request.',
+            ('view', 'method'),
+            DURATION_BUCKETS,
+        )
+        self.response_size = Histogram(
+            'http_response_size_bytes',
+            'Size of non-streaming response bodies.',
+            ('view', 'method'),
+            SIZE_BUCKETS,
+        )
+        self.histograms = [
+            self.request_duration,
+            self.db_queries,
+            self.db_duration,
+            self.serializer_duration,
+            self.response_size,
+        ]
+        self.counters = []
+
+    @property
+    def path(self):
+        """Return the file this process writes its counts to."""
+        return os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+
+    @property
+    def collectors(self):
+        """Return every histogram and counter."""
+        return self.histograms + self.counters
+
+    def add_counter(self, name, documentation, read):
+        """Add a counter whose value ``read`` returns."""
+        self.counters.append(Counter(name, documentation, read))
+
+    def snapshot(self):
+        """Return the counts of every metric of this process."""
+        return {
+            collector.name: collector.snapshot()
+            for collector in self.collectors
+        }
+
+    def flush(self):
+        """Schedule writing this process's counts to its file.
+
+        The counts are written ``flush_seconds`` after the first request
+        since the last write, so they are never older than that.
+        """
+        if self.directory is None:
+            return
+
+        with self._flush_lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.flush_seconds, self.write)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def write(self):
+        """Write this process's counts to its file."""
+        with self._flush_lock:
+            self._timer = None
+        data = {
+            name: [[list(values), counts] for values, counts in series.items()]
+            for name, series in self.snapshot().items()
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def collect(self):
+        """Return the counts of every metric summed over processes."""
+        totals = {collector.name: {} for collector in self.collectors}
+        if self.directory is not None:
+            own_path = self.path
+            for path in glob.glob(
+                os.path.join(self.directory, 'metrics-*.json'),
+            ):
+                if path == own_path:
+                    continue
+                try:
+                    with open(path) as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                for name, series in data.items():
+                    if name in totals:
+                        _add_series(totals[name], {
+                            tuple(values): counts
+                            for values, counts in series
+                        })
+        for name, series in self.snapshot().items():
+            _add_series(totals[name], series)
+
+        return totals
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        totals = self.collect()
+        lines = []
+        for collector in self.collectors:
+            lines.extend(collector.render(totals[collector.name]))
+
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """Remove every series of this process."""
+        for histogram in self.histograms:
+            histogram.clear()
+
+
+def _metrics_from_settings():
+    """Create the metrics from the METRICS setting."""
+    options = get_options('METRICS')
+    return Metrics(
+        directory=options.get('DIRECTORY'),
+        flush_seconds=options.get('FLUSH_SECONDS', 1),
+    )
+
+
+metrics = _metrics_from_settings()
+
+
+class RequestStats:
+    """Queries and serializer time of one request.
+
+    Instances are database execute wrappers, recording each query run
+    while installed.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+    def top_fingerprints(self, limit=5):
+        """Return (fingerprint, count, seconds) for the slowest queries."""
+        totals = defaultdict(lambda: [0, 0])
+        for sql, duration in self.queries:
+            total = totals[fingerprint(sql)]
+            total[0] += 1
+            total[1] += duration
+        ranked = sorted(totals.items(), key=lambda item: -item[1][1])
+
+        return [(sql, count, secs) for sql, (count, secs) in ranked[:limit]]
+
+
+def timed_serialization(func):
+    """Add the time spent in a function to the request's serializer time.
+
+    Only the outermost timed call is counted, so nested serializers and
+    rendering their output are not counted twice.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = current_stats.get()
+        if stats is None or stats.serializing:
+            return func(*args, **kwargs)
+
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.serializing = False
+            stats.serializer_time += time.perf_counter() - start
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Record timing, queries and response size of each request.
+
+    Requests slower than ``METRICS['SLOW_REQUEST_SECONDS']`` are logged
+    with the fingerprints of their slowest queries. Async views are only
+    timed, as their queries run in other threads. Place it first so that
+    the other middleware is timed too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+
+        self.record(request, response, time.perf_counter() - start, stats)
+        metrics.flush()
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        metrics.flush()
+        return response
+
+    def record(self, request, response, duration, stats=None):
+        """Add a request to the metrics, and log it if slow."""
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        method = request.method
+        metrics.request_duration.observe(
+            (view, method, str(response.status_code)),
+            duration,
+        )
+        if not response.streaming:
+            size = len(response.content)
+            metrics.response_size.observe((view, method), size)
+        if stats is None:
+            return
+
+        metrics.db_queries.observe((view, method), len(stats.queries))
+        metrics.db_duration.observe((view, method), stats.db_time)
+        metrics.serializer_duration.observe(
+            (view, method),
+            stats.serializer_time,
+        )
+
+        if duration < settings.METRICS['SLOW_REQUEST_SECONDS']:
+            return
+
+        logger.warning(
+            'Slow request: %s %s (%s) %s in %.0fms, %d queries in %.0fms, '
+            'serializers %.0fms\n%s',
+            method,
+            request.path,
+            view,
+            response.status_code,
+            duration * 1000,
+            len(stats.queries),
+            stats.db_time * 1000,
+            stats.serializer_time * 1000,
+            '\n'.join(
+                f'  {count}x {seconds * 1000:.1f}ms {sql}'
+                for sql, count, seconds in stats.top_fingerprints()
+            ),
+        )
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:29
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def dedupe_names(apps, schema_editor):
+    """Merge tags and ingredients that share a user and name."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in [
+        ('Tag', 'tags'),
+        ('Ingredient', 'ingredients'),
+    ]:
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(field_name).remote_field.through
+        fk = f'{model_name.lower()}_id'
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep_id=Min('id'),
+            total=Count('id'),
+        ).filter(total__gt=1)
+        for duplicate in duplicates:
+            keep_id = duplicate['keep_id']
+            extra_ids = list(model.objects.filter(
+                user=duplicate['user'],
+                name=duplicate['name'],
+            ).exclude(id=keep_id).values_list('id', flat=True))
+            recipe_ids = set(through.objects.filter(
+                **{f'{fk}__in': extra_ids}
+            ).values_list('recipe_id', flat=True))
+            recipe_ids -= set(through.objects.filter(
+                **{fk: keep_id}
+            ).values_list('recipe_id', flat=True))
+            through.objects.bulk_create(
+                through(recipe_id=recipe_id, **{fk: keep_id})
+                for recipe_id in recipe_ids
+            )
+            model.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_names, migrations.RunPython.noop),
+    ]
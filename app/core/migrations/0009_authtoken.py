@@ -0,0 +1,44 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_legacy_tokens(apps, schema_editor):
+    """Copy tokens from rest_framework.authtoken, if its table exists.
+
+    Copied tokens expire one TTL after the migration, so clients keep
+    working until then.
+    """
+    connection = schema_editor.connection
+    if 'authtoken_token' not in connection.introspection.table_names():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO core_authtoken (key, user_id, created, expires) '
+            'SELECT key, user_id, created, '
+            "now() + %s * interval '1 second' FROM authtoken_token",
+            [settings.AUTH_TOKEN['TTL']],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_legacy_tokens, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,22 @@
 """
 Database models.
 """
-import uuid
 import os
+import secrets
+import uuid
+from datetime import timedelta
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import (
+    models,
+    transaction,
+)
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -13,6 +24,21 @@ from django.contrib.auth.models import (
 )
 
 
+SEARCH_CONFIG = 'english'
+
+
+def recipe_search_vector():
+    """Return the expression computing a recipe's search vector.
+
+    Titles are weighted above descriptions. The database trigger added
+    in migration 0007 computes the same value on insert and update.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image."""
     ext = os.path.splitext(filename)[1]
@@ -56,6 +82,56 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class AuthTokenManager(models.Manager):
+    """Manager for auth tokens."""
+
+    def rotate(self, token):
+        """Issue a new token for the user of a token, and return it.
+
+        The old token keeps working for the rotation grace period, so
+        requests already sent with it do not fail.
+        """
+        grace = timedelta(seconds=settings.AUTH_TOKEN['ROTATION_GRACE'])
+        with transaction.atomic():
+            new_token = self.create(user=token.user)
+            token.expires = min(token.expires, timezone.now() + grace)
+            token.save(update_fields=['expires'])
+
+        return new_token
+
+
+class AuthToken(models.Model):
+    """API token for a user, valid until it expires."""
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='auth_tokens',
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    def __str__(self):
+        return self.key
+
+    def save(self, *args, **kwargs):
+        """Save the token, with a new key and expiry if not set."""
+        if not self.key:
+            self.key = secrets.token_hex(20)
+        if self.expires is None:
+            self.expires = timezone.now() + timedelta(
+                seconds=settings.AUTH_TOKEN['TTL'],
+            )
+        super().save(*args, **kwargs)
+
+    @property
+    def is_expired(self):
+        """Return whether the token can no longer be used."""
+        return self.expires <= timezone.now()
+
+
 class Recipe(models.Model):
     """Recipe object."""
     user = models.ForeignKey(
@@ -70,10 +146,46 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_renditions = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_desc_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Save the recipe, bumping the version of existing recipes."""
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'version', 'updated_at',
+                }
+        super().save(*args, **kwargs)
+
 
 class Tag(models.Model):
     """Tag for filtering recipes."""
@@ -83,6 +195,14 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_unique',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -95,5 +215,13 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_unique',
+            ),
+        ]
+
     def __str__(self):
         return self.name
@@ -0,0 +1,9 @@
+"""
+Helpers for the dictionary settings that configure each feature.
+"""
+from django.conf import settings
+
+
+def get_options(name):
+    """Return the options dictionary in the setting ``name``, if any."""
+    return getattr(settings, name, {})
@@ -0,0 +1,39 @@
+"""
+JSON parsers for the APIs.
+"""
+import codecs
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.renderers import (
+    ORJSONRenderer,
+    orjson,
+)
+
+
+class ORJSONParser(JSONParser):
+    """JSON parser using orjson, falling back to DRF's parser.
+
+    orjson only reads UTF-8 and always rejects NaN and Infinity, so
+    other encodings, and non-strict parsing, go through JSONParser.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON."""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (
+            orjson is None
+            or not self.strict
+            or codecs.lookup(encoding).name != 'utf-8'
+        ):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
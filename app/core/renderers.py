@@ -0,0 +1,100 @@
+"""
+JSON renderers for the APIs.
+"""
+import decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+from core.metrics import timed_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+LINE_SEPARATORS = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson, falling back to DRF's renderer.
+
+    Output matches JSONRenderer for compact responses, except that
+    Decimal values are written as strings when COERCE_DECIMAL_TO_STRING
+    is set, instead of being rounded to floats. Indented output, ASCII
+    output, and data orjson cannot encode (such as integers beyond 64
+    bits) are rendered by JSONRenderer.
+    """
+    options = (
+        orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+    )
+    encoder = encoders.JSONEncoder()
+
+    def default(self, obj):
+        """Return a value orjson can encode for an unsupported type."""
+        if isinstance(obj, decimal.Decimal):
+            if api_settings.COERCE_DECIMAL_TO_STRING:
+                return str(obj)
+            return float(obj)
+
+        return self.encoder.default(obj)
+
+    def dumps(self, data):
+        """Return data as compact JSON bytes, or None if unsupported."""
+        if orjson is None or self.ensure_ascii:
+            return None
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return None
+
+        # Escape line separators as JSONRenderer does, so that the output
+        # is a strict JavaScript subset.
+        for char, escaped in LINE_SEPARATORS:
+            if char in ret:
+                ret = ret.replace(char, escaped)
+
+        return ret
+
+    @timed_serialization
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON, returning a bytestring."""
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        ret = self.dumps(data) if indent is None and self.compact else None
+        if ret is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return ret
+
+    def iter_render(self, items, chunk_size=500):
+        """Yield a JSON array of items as bytestrings, a chunk at a time.
+
+        Only chunk_size items are encoded at once, so large querysets
+        can be streamed without building the whole document in memory.
+        """
+        yield b'['
+        chunk = []
+        first = True
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield self._render_chunk(chunk, first)
+                chunk = []
+                first = False
+        if chunk:
+            yield self._render_chunk(chunk, first)
+        yield b']'
+
+    def _render_chunk(self, chunk, first):
+        """Return the items of a chunk as part of a JSON array."""
+        ret = self.render(chunk)[1:-1]
+        return ret if first else b',' + ret
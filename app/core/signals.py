@@ -0,0 +1,84 @@
+"""
+Signal handlers for the core models.
+"""
+import contextlib
+
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+def bump_recipe_versions(queryset):
+    """Bump the version of every recipe in a queryset."""
+    queryset.update(version=F('version') + 1, updated_at=timezone.now())
+
+
+@contextlib.contextmanager
+def marking_link_changes(recipe):
+    """Mark link changes on a recipe instead of bumping its version.
+
+    Inside the block, ``recipe._links_changed`` is set when its tags or
+    ingredients change, so that the caller can bump the version once
+    when it saves the recipe.
+    """
+    recipe._links_changed = False
+    try:
+        yield
+    finally:
+        del recipe._links_changed
+
+
+def _mark_links_changed(recipe):
+    """Mark a recipe's links as changed; return whether it was marked."""
+    if not hasattr(recipe, '_links_changed'):
+        return False
+
+    recipe._links_changed = True
+    return True
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_versions_on_link_change(sender, instance, action, reverse,
+                                 pk_set, **kwargs):
+    """Bump recipe versions when their tags or ingredients change."""
+    if action == 'pre_clear' and reverse:
+        bump_recipe_versions(Recipe.objects.filter(
+            **{f'{instance._meta.model_name}s': instance}
+        ))
+    elif action == 'post_clear' and not reverse:
+        if _mark_links_changed(instance):
+            return
+        bump_recipe_versions(Recipe.objects.filter(pk=instance.pk))
+        instance.version += 1
+    elif action in ('post_add', 'post_remove') and pk_set:
+        if reverse:
+            bump_recipe_versions(Recipe.objects.filter(pk__in=pk_set))
+        elif not _mark_links_changed(instance):
+            bump_recipe_versions(Recipe.objects.filter(pk=instance.pk))
+            instance.version += 1
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def bump_versions_on_attr_change(sender, instance, **kwargs):
+    """Bump versions of recipes showing a changed tag or ingredient."""
+    if kwargs.get('created'):
+        return
+
+    bump_recipe_versions(
+        Recipe.objects.filter(**{f'{sender._meta.model_name}s': instance})
+    )
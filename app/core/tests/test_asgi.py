@@ -0,0 +1,159 @@
+"""
+Tests for serving the app over ASGI.
+"""
+import asyncio
+import json
+from decimal import Decimal
+
+from asgiref.sync import (
+    async_to_sync,
+    sync_to_async,
+)
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+)
+from django.urls import reverse
+
+from app.asgi import application
+from core.authentication import token_cache
+from core.models import (
+    AuthToken,
+    Recipe,
+)
+
+
+HEALTH_CHECK_URL = reverse('health-check')
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+@async_to_sync
+async def asgi_get(path, headers=()):
+    """Send a GET through the ASGI application.
+
+    Returns the status, headers and the body chunks sent.
+    """
+    communicator = ApplicationCommunicator(application, {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), *headers],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    })
+    await communicator.send_input({'type': 'http.request', 'body': b''})
+    start = await communicator.receive_output(10)
+    chunks = []
+    while True:
+        message = await communicator.receive_output(10)
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    await communicator.wait()
+
+    return start['status'], dict(start['headers']), chunks
+
+
+class HealthCheckASGITests(SimpleTestCase):
+    """Test the health check served over ASGI."""
+
+    def test_health_check(self):
+        """Test the health check responds from the event loop."""
+        status_code, headers, chunks = asgi_get(HEALTH_CHECK_URL)
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(headers[b'Content-Type'], b'application/json')
+        self.assertEqual(json.loads(b''.join(chunks)), {'healthy': True})
+
+
+class RecipeASGITests(TransactionTestCase):
+    """Test the recipe APIs served over ASGI.
+
+    Sync code runs in Django's own thread and database connection, so
+    the data is committed rather than kept in a test transaction.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        token = AuthToken.objects.create(user=self.user)
+        self.headers = [(b'authorization', f'Token {token.key}'.encode())]
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=Decimal('5.25'),
+            )
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_list_recipes(self):
+        """Test lists authenticate from the token cache."""
+        for _ in range(2):
+            status_code, _, chunks = asgi_get(RECIPES_URL, self.headers)
+
+            self.assertEqual(status_code, 200)
+            body = json.loads(b''.join(chunks))
+            self.assertEqual(len(body['results']), 3)
+
+        self.assertEqual(token_cache.stats()['hits'], 1)
+
+    def test_concurrent_requests(self):
+        """Test concurrent requests each see their own user's data."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        other_token = AuthToken.objects.create(user=other)
+        other_headers = [
+            (b'authorization', f'Token {other_token.key}'.encode()),
+        ]
+
+        async def get_both():
+            return await asyncio.gather(*(
+                sync_to_async(asgi_get, thread_sensitive=False)(
+                    RECIPES_URL,
+                    headers,
+                )
+                for headers in [self.headers, other_headers] * 4
+            ))
+
+        results = async_to_sync(get_both)()
+
+        for i, (status_code, _, chunks) in enumerate(results):
+            self.assertEqual(status_code, 200)
+            body = json.loads(b''.join(chunks))
+            self.assertEqual(len(body['results']), 3 if i % 2 == 0 else 0)
+
+    def test_list_requires_token(self):
+        """Test requests without a token are rejected."""
+        status_code, _, _ = asgi_get(RECIPES_URL)
+
+        self.assertEqual(status_code, 401)
+
+    def test_streamed_export(self):
+        """Test a streamed export is sent a chunk at a time."""
+        status_code, headers, chunks = asgi_get(EXPORT_URL, self.headers)
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(headers[b'Content-Type'], b'application/x-ndjson')
+        self.assertEqual(len(chunks), 4)
+        lines = b''.join(chunks).splitlines()
+        self.assertEqual(
+            [json.loads(line)['title'] for line in lines],
+            ['Recipe 0', 'Recipe 1', 'Recipe 2'],
+        )
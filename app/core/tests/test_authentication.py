@@ -0,0 +1,309 @@
+"""
+Tests for authentication.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    PasswordTimer,
+    TimingSafeModelBackend,
+    TokenCache,
+    _token_cache_from_settings,
+    password_timer,
+    token_cache,
+)
+from core.models import AuthToken
+
+
+ME_URL = reverse('user:me')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_user()
+        self.token = AuthToken.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_authenticate_returns_user_and_token(self):
+        """Test a valid key returns its user and token."""
+        user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+
+    def test_cached_lookup_skips_database(self):
+        """Test a repeated lookup is served from the cache."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        stats = token_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_invalid_key_fails(self):
+        """Test an unknown key is rejected and not cached."""
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+        self.assertIsNone(token_cache.get('invalid'))
+
+    def test_deleted_token_is_evicted(self):
+        """Test deleting a token stops it authenticating."""
+        self.auth.authenticate_credentials(self.token.key)
+        key = self.token.key
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_is_evicted(self):
+        """Test deactivating a user stops their token authenticating."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_profile_update_evicts_other_tokens(self):
+        """Test updating the user refreshes all of their cached tokens."""
+        other_token = AuthToken.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        other_client = APIClient()
+        other_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {other_token.key}',
+        )
+        other_client.get(ME_URL)
+
+        client.patch(ME_URL, {'name': 'Updated name'})
+        res = other_client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated name')
+
+    def test_password_change_is_evicted(self):
+        """Test changing the password evicts the user's tokens."""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.set_password('newpass123')
+
+        self.user.save(update_fields=['password'])
+
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_updated_user_is_evicted(self):
+        """Test updating the user through the API refreshes the cache."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        client.get(ME_URL)
+
+        client.patch(ME_URL, {'name': 'Updated name'})
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated name')
+
+    def test_cached_user_is_a_copy(self):
+        """Test changes to a returned user do not leak into the cache."""
+        self.auth.authenticate_credentials(self.token.key)
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        user.name = 'Changed'
+
+        cached_user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertNotEqual(cached_user.name, 'Changed')
+
+    def test_api_request_uses_cache(self):
+        """Test API requests with a token reuse the cached lookup."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        res = client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_expired_token_fails(self):
+        """Test an expired token is rejected and not cached."""
+        self.token.expires = timezone.now()
+        self.token.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_cached_token_expiry_skips_database(self):
+        """Test a cached token is rejected once expired, without queries."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        later = self.token.expires + timedelta(seconds=1)
+        with patch('django.utils.timezone.now', return_value=later), \
+                self.assertNumQueries(0), \
+                self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+
+
+class TokenCacheTests(TestCase):
+    """Test the token cache."""
+
+    def test_cache_is_bounded(self):
+        """Test the least recently used entry is evicted when full."""
+        cache = TokenCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        """Test entries are not returned after the timeout."""
+        cache = TokenCache(timeout=0)
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_cache(self):
+        """Test entries and deletes are shared through a Django cache."""
+        first = TokenCache(cache_alias='default')
+        second = TokenCache(cache_alias='default')
+        first.set('a', 1)
+        self.assertEqual(first.get('a'), 1)
+
+        self.assertEqual(second.get('a'), 1)
+        self.assertEqual(second.stats()['shared_hits'], 1)
+
+        first.delete('a')
+        self.assertIsNone(second.get('a'))
+        self.assertIsNone(first.get('a'))
+
+    @override_settings(AUTH_TOKEN_CACHE={'CACHE_ALIAS': 'default'})
+    def test_per_process_cache_alias_not_used(self):
+        """Test a cache that workers do not share is not used."""
+        self.assertIsNone(_token_cache_from_settings().cache_alias)
+
+
+class TimingSafeModelBackendTests(TestCase):
+    """Test logging in with the timing safe backend."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.backend = TimingSafeModelBackend()
+        self.average = password_timer.average
+
+    def tearDown(self):
+        password_timer.average = self.average
+
+    def test_valid_credentials(self):
+        """Test a valid email and password return the user."""
+        user = self.backend.authenticate(
+            None,
+            username='user@example.com',
+            password='testpass123',
+        )
+
+        self.assertEqual(user, self.user)
+
+    def test_wrong_password(self):
+        """Test a wrong password returns None."""
+        user = self.backend.authenticate(
+            None,
+            username='user@example.com',
+            password='wrong',
+        )
+
+        self.assertIsNone(user)
+
+    def test_unknown_email_sleeps_instead_of_hashing(self):
+        """Test unknown emails wait as long as a check, without hashing."""
+        password_timer.average = 0.05
+
+        with patch('core.authentication.time.sleep') as sleep, \
+                patch('django.contrib.auth.base_user.make_password') as make:
+            user = self.backend.authenticate(
+                None,
+                username='unknown@example.com',
+                password='testpass123',
+            )
+
+        self.assertIsNone(user)
+        sleep.assert_called_once_with(0.05)
+        make.assert_not_called()
+
+    def test_login_rehashes_outdated_password(self):
+        """Test a PBKDF2 password is rehashed with Argon2 on login."""
+        self.user.password = make_password(
+            'testpass123',
+            hasher='pbkdf2_sha256',
+        )
+        self.user.save()
+
+        self.backend.authenticate(
+            None,
+            username='user@example.com',
+            password='testpass123',
+        )
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+
+
+class PasswordTimerTests(TestCase):
+    """Test timing password checks."""
+
+    def test_first_wait_hashes_and_records(self):
+        """Test waiting before any check hashes once to measure it."""
+        timer = PasswordTimer()
+
+        with patch('core.authentication.time.sleep') as sleep:
+            timer.wait('secret')
+
+        sleep.assert_not_called()
+        self.assertGreater(timer.average, 0)
+
+    def test_moving_average(self):
+        """Test recorded durations move the average by their weight."""
+        timer = PasswordTimer(weight=0.5)
+        timer.record(1.0)
+        timer.record(3.0)
+
+        self.assertEqual(timer.average, 2.0)
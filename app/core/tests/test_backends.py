@@ -0,0 +1,72 @@
+"""
+Tests for the database backend.
+"""
+from unittest.mock import patch
+
+from django.db import connections
+from django.test import TestCase
+
+
+class HealthCheckTests(TestCase):
+    """Test health checks of persistent connections."""
+
+    def setUp(self):
+        self.connection = connections.create_connection('default')
+        self.connection.settings_dict = {
+            **self.connection.settings_dict,
+            'CONN_HEALTH_CHECKS': True,
+        }
+        self.connection.ensure_connection()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def _query(self):
+        """Run a trivial query on the connection."""
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def _new_request(self):
+        """Do what Django does to connections between requests."""
+        self.connection.close_if_unusable_or_obsolete()
+
+    def test_new_connection_not_checked(self):
+        """Test a connection opened by the request is not checked."""
+        with patch.object(self.connection, 'is_usable') as is_usable:
+            self._query()
+
+        is_usable.assert_not_called()
+
+    def test_reused_connection_checked_once(self):
+        """Test a reused connection is checked before its first query."""
+        self._new_request()
+
+        with patch.object(
+            self.connection,
+            'is_usable',
+            wraps=self.connection.is_usable,
+        ) as is_usable:
+            self._query()
+            self._query()
+
+        is_usable.assert_called_once_with()
+
+    def test_unusable_connection_replaced(self):
+        """Test a dropped connection is replaced before it is used."""
+        old = self.connection.connection
+        self._new_request()
+
+        with patch.object(self.connection, 'is_usable', return_value=False):
+            self._query()
+
+        self.assertIsNot(self.connection.connection, old)
+
+    def test_health_checks_disabled(self):
+        """Test connections are not checked unless enabled."""
+        self.connection.settings_dict['CONN_HEALTH_CHECKS'] = False
+        self._new_request()
+
+        with patch.object(self.connection, 'is_usable') as is_usable:
+            self._query()
+
+        is_usable.assert_not_called()
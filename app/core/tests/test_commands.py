@@ -1,13 +1,34 @@
 """
 Test custom Django management commands.
 """
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+import json
+import os
+import tempfile
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import (
+    CommandError,
+    call_command,
+)
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.utils import timezone
+
+from core.models import (
+    AuthToken,
+    Recipe,
+    Tag,
+    Ingredient,
+)
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +53,231 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BackfillSearchVectorsTests(TestCase):
+    """Test the backfill_search_vectors command."""
+
+    def test_backfill_search_vectors(self):
+        """Test missing search vectors are computed in batches."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        recipes = [
+            Recipe.objects.create(
+                user=user,
+                title=f'Curry {i}',
+                time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            for i in range(3)
+        ]
+        Recipe.objects.update(search_vector=None)
+
+        call_command(
+            'backfill_search_vectors',
+            batch_size=2,
+            stdout=StringIO(),
+        )
+
+        self.assertFalse(
+            Recipe.objects.filter(search_vector__isnull=True).exists()
+        )
+        found = Recipe.objects.filter(search_vector='curry')
+        self.assertEqual(found.count(), len(recipes))
+
+
+class PurgeTokensTests(TestCase):
+    """Test the purge_tokens command."""
+
+    def test_purge_expired_tokens(self):
+        """Test expired tokens are deleted in batches and others kept."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        past = timezone.now() - timedelta(minutes=1)
+        for _ in range(5):
+            AuthToken.objects.create(user=user, expires=past)
+        valid = AuthToken.objects.create(user=user)
+        out = StringIO()
+
+        call_command('purge_tokens', batch_size=2, stdout=out)
+
+        self.assertEqual(list(AuthToken.objects.all()), [valid])
+        self.assertIn('Purged 5 tokens.', out.getvalue())
+
+
+class ExportRecipesTests(TestCase):
+    """Test the export_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            for i in range(3)
+        ]
+
+    def test_export_recipes(self):
+        """Test recipes are written to stdout as NDJSON."""
+        out = StringIO()
+
+        call_command('export_recipes', self.user.email, stdout=out)
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [line['id'] for line in lines],
+            [recipe.id for recipe in self.recipes],
+        )
+        self.assertEqual(lines[0]['price'], '5.00')
+
+    def test_export_recipes_resume(self):
+        """Test a resumed CSV export appends rows to the output file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.csv')
+            call_command(
+                'export_recipes',
+                self.user.email,
+                export_format='csv',
+                output=path,
+                chunk_size=1,
+            )
+            with open(path) as file:
+                lines = file.readlines()
+            with open(path, 'w') as file:
+                file.writelines(lines[:2])
+
+            call_command(
+                'export_recipes',
+                self.user.email,
+                export_format='csv',
+                output=path,
+                append=True,
+                after=self.recipes[0].id,
+            )
+
+            with open(path) as file:
+                self.assertEqual(file.readlines(), lines)
+
+    def test_export_unknown_user(self):
+        """Test exporting for an unknown email fails."""
+        with self.assertRaises(CommandError):
+            call_command('export_recipes', 'missing@example.com')
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _write(self, name, content):
+        """Write a file to the temporary directory and return its path."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def _ndjson(self, count, start=0):
+        """Return NDJSON for count recipes."""
+        return ''.join(
+            json.dumps({
+                'title': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '5.25',
+                'tags': [{'name': 'Vegan'}, {'name': f'Tag {i % 2}'}],
+                'ingredients': [{'name': 'Salt'}],
+            }) + '\n'
+            for i in range(start, start + count)
+        )
+
+    def _import(self, *args, **options):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command(
+            'import_recipes', self.user.email, *args, stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test recipes, tags, ingredients and links are loaded."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        path = self._write('recipes.ndjson', self._ndjson(5))
+
+        for method in ('copy', 'bulk'):
+            self._import(path, method=method, batch_size=2)
+
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 10)
+        self.assertEqual(
+            sorted(Tag.objects.values_list('name', flat=True)),
+            ['Tag 0', 'Tag 1', 'Vegan'],
+        )
+        self.assertEqual(Ingredient.objects.count(), 1)
+        imported = recipes.filter(title='Recipe 3', search_vector='recipe')
+        self.assertEqual(imported.count(), 2)
+        for recipe in imported:
+            self.assertEqual(recipe.price, Decimal('5.25'))
+            self.assertEqual(
+                sorted(recipe.tags.values_list('name', flat=True)),
+                ['Tag 1', 'Vegan'],
+            )
+            self.assertEqual(recipe.ingredients.get().name, 'Salt')
+
+    def test_import_csv(self):
+        """Test recipes are loaded from a CSV export."""
+        path = self._write('recipes.csv', (
+            'id,title,description,time_minutes,price,link,tags,ingredients\n'
+            '1,Curry,"Hot, spicy",30,9.99,,Vegan;Thai,Rice\n'
+        ))
+
+        self._import(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.description, 'Hot, spicy')
+        self.assertEqual(recipe.link, '')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.get().name, 'Rice')
+
+    def test_import_resumes_from_checkpoint(self):
+        """Test an import skips records already committed."""
+        path = self._write('recipes.ndjson', self._ndjson(5))
+        checkpoint = os.path.join(self.directory.name, 'import.json')
+        with open(checkpoint, 'w') as file:
+            json.dump({'path': os.path.abspath(path), 'records': 3}, file)
+
+        out = self._import(path, checkpoint=checkpoint)
+
+        self.assertIn('Resuming after 3 records.', out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            ['Recipe 3', 'Recipe 4'],
+        )
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_invalid_record_keeps_committed_batches(self):
+        """Test an invalid record stops the import at its batch."""
+        content = self._ndjson(2) + '{"title": "Bad", "price": "x"}\n'
+        path = self._write('recipes.ndjson', content)
+        checkpoint = os.path.join(self.directory.name, 'import.json')
+
+        with self.assertRaisesRegex(CommandError, 'line 3'):
+            self._import(path, batch_size=2, checkpoint=checkpoint)
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file)['records'], 2)
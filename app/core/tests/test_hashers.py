@@ -0,0 +1,49 @@
+"""
+Tests for the password hashers.
+"""
+from django.contrib.auth.hashers import (
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.test import (
+    SimpleTestCase,
+    override_settings,
+)
+
+from core.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+
+
+class PasswordHasherTests(SimpleTestCase):
+    """Test hashers configured from settings."""
+
+    def test_argon2_is_preferred(self):
+        """Test new passwords are hashed with Argon2id."""
+        encoded = make_password('secret')
+
+        self.assertIsInstance(identify_hasher(encoded), Argon2PasswordHasher)
+        self.assertTrue(encoded.startswith('argon2$argon2id$'))
+        self.assertIn('m=19456,t=2,p=1', encoded)
+
+    def test_argon2_cost_change_needs_update(self):
+        """Test hashes with other Argon2 costs are rehashed."""
+        encoded = make_password('secret')
+        hasher = get_hasher('argon2')
+
+        self.assertFalse(hasher.must_update(encoded))
+        with override_settings(PASSWORD_HASHING={'ARGON2_TIME_COST': 3}):
+            self.assertTrue(hasher.must_update(encoded))
+
+    def test_pbkdf2_iterations_from_settings(self):
+        """Test PBKDF2 uses and checks the configured iterations."""
+        hasher = PBKDF2PasswordHasher()
+        with override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000}):
+            encoded = make_password('secret', hasher='pbkdf2_sha256')
+
+            self.assertEqual(hasher.decode(encoded)['iterations'], 1000)
+            self.assertFalse(hasher.must_update(encoded))
+
+        self.assertTrue(hasher.must_update(encoded))
@@ -18,3 +18,11 @@ class HealthCheckTests(TestCase):
         res = client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_health_check_get_only(self):
+        """Test health check rejects other methods."""
+        client = APIClient()
+        url = reverse('health-check')
+        res = client.post(url)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
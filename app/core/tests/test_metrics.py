@@ -0,0 +1,197 @@
+"""
+Tests for request metrics.
+"""
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.metrics import (
+    Histogram,
+    Metrics,
+    fingerprint,
+    metrics,
+)
+from core.models import AuthToken
+
+
+METRICS_URL = reverse('metrics')
+ME_URL = reverse('user:me')
+METRICS = {'SLOW_REQUEST_SECONDS': 1, 'TOKEN': 'abc'}
+
+
+class MetricsTests(SimpleTestCase):
+    """Test metric helpers."""
+
+    def test_fingerprint(self):
+        """Test literals and parameter lists are replaced."""
+        sql = (
+            'SELECT "id" FROM "core_recipe" WHERE "title" = \'Soup\' '
+            'AND "id" IN (%s, %s,  %s) LIMIT 21'
+        )
+
+        self.assertEqual(
+            fingerprint(sql),
+            'SELECT "id" FROM "core_recipe" WHERE "title" = ? '
+            'AND "id" IN (...) LIMIT ?',
+        )
+
+    def test_histogram_render(self):
+        """Test histograms render cumulative buckets, sum and count."""
+        histogram = Histogram('latency', 'Latency.', ('view',), (1, 5))
+        for amount in (0.5, 1, 3, 10):
+            histogram.observe(('list',), amount)
+
+        self.assertEqual(histogram.render(), [
+            '# HELP latency Latency.',
+            '# TYPE latency histogram',
+            'latency_bucket{view="list",le="1"} 2',
+            'latency_bucket{view="list",le="5"} 3',
+            'latency_bucket{view="list",le="+Inf"} 4',
+            'latency_sum{view="list"} 14.5',
+            'latency_count{view="list"} 4',
+        ])
+
+    def test_render_adds_up_processes(self):
+        """Test rendering sums the counts written by every process."""
+        with tempfile.TemporaryDirectory() as directory:
+            other = Metrics(directory=directory)
+            other.db_queries.observe(('list', 'GET'), 2)
+            with patch('core.metrics.os.getpid', return_value=1):
+                other.write()
+            current = Metrics(directory=directory)
+            current.db_queries.observe(('list', 'GET'), 3)
+
+            body = current.render()
+
+        self.assertIn(
+            'http_request_db_queries_sum{view="list",method="GET"} 5',
+            body,
+        )
+        self.assertIn(
+            'http_request_db_queries_count{view="list",method="GET"} 2',
+            body,
+        )
+
+    def test_flush_writes_counts(self):
+        """Test a flush writes the process's counts after a delay."""
+        with tempfile.TemporaryDirectory() as directory:
+            current = Metrics(directory=directory, flush_seconds=0.01)
+            current.db_queries.observe(('list', 'GET'), 3)
+
+            current.flush()
+            deadline = time.monotonic() + 5
+            while not os.path.exists(current.path):
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+
+@override_settings(METRICS=METRICS)
+class MetricsMiddlewareTests(TestCase):
+    """Test recording and exposing request metrics."""
+
+    def setUp(self):
+        metrics.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        metrics.clear()
+        token_cache.clear()
+
+    def _get_metrics(self):
+        """Return the metrics text."""
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer abc')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_requests_are_recorded(self):
+        """Test request timing, queries and size are exposed."""
+        self.client.get(ME_URL)
+
+        res = self._get_metrics()
+
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        for line in (
+            'http_request_duration_seconds_count'
+            '{view="user:me",method="GET",status="200"} 1',
+            'http_request_db_queries_count{view="user:me",method="GET"} 1',
+            'http_request_serializer_duration_seconds_count'
+            '{view="user:me",method="GET"} 1',
+            'http_response_size_bytes_count{view="user:me",method="GET"} 1',
+        ):
+            self.assertIn(line, body)
+
+    def test_queries_are_counted(self):
+        """Test the queries run by a request are counted."""
+        self.client.patch(ME_URL, {'password': 'newpass123'})
+
+        res = self._get_metrics()
+
+        self.assertIn(
+            'http_request_db_queries_sum{view="user:me",method="PATCH"} 2',
+            res.content.decode(),
+        )
+
+    @override_settings(METRICS={**METRICS, 'SLOW_REQUEST_SECONDS': 0})
+    def test_slow_requests_are_logged(self):
+        """Test slow requests are logged with query fingerprints."""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.patch(ME_URL, {'name': 'New name'})
+
+        self.assertIn('PATCH /api/user/me/ (user:me) 200', logs.output[0])
+        self.assertIn('UPDATE "core_user" SET "name" = ?', logs.output[0])
+
+    def test_token_cache_counters(self):
+        """Test token cache hits and misses are exposed as counters."""
+        token = AuthToken.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for _ in range(2):
+            client.get(ME_URL)
+
+        body = self._get_metrics().content.decode()
+
+        self.assertIn('# TYPE auth_token_cache_hits_total counter', body)
+        self.assertIn('auth_token_cache_hits_total 1\n', body)
+        self.assertIn('auth_token_cache_misses_total 1\n', body)
+
+    def test_metrics_token(self):
+        """Test metrics require the token when one is set."""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer xyz')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS={**METRICS, 'TOKEN': None})
+    def test_metrics_without_token(self):
+        """Test metrics are not served when no token is set."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS={**METRICS, 'TOKEN': None}, DEBUG=True)
+    def test_metrics_without_token_in_debug(self):
+        """Test metrics are served without a token in DEBUG."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,134 @@
+"""
+Tests for the JSON renderer and parser.
+"""
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+def sample_recipes(count=3):
+    """Return data shaped like a recipe list response."""
+    return {
+        'next': 'http://testserver/api/recipe/recipes/?cursor=cD0z',
+        'previous': None,
+        'results': [
+            {
+                'id': i,
+                'title': f'Crème brûlée \u2028 {i}',
+                'time_minutes': 30,
+                'price': '5.25',
+                'link': '',
+                'tags': [{'id': 1, 'name': 'Dessert'}],
+                'ingredients': [],
+                'image_renditions': {},
+            }
+            for i in range(count)
+        ],
+    }
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer."""
+
+    def setUp(self):
+        self.renderer = ORJSONRenderer()
+
+    def test_matches_json_renderer(self):
+        """Test output is identical to DRF's renderer for API data."""
+        data = sample_recipes()
+
+        self.assertEqual(
+            self.renderer.render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_special_types(self):
+        """Test datetimes, decimals and other types are encoded."""
+        key = uuid.uuid4()
+        data = {
+            'created': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 6000, tzinfo=timezone.utc,
+            ),
+            'day': datetime.date(2024, 1, 2),
+            'price': Decimal('5.10'),
+            'key': key,
+            'label': gettext_lazy('Hello'),
+            1: 'one',
+        }
+
+        self.assertEqual(
+            self.renderer.render(data),
+            (
+                '{"created":"2024-01-02T03:04:05.006000Z",'
+                '"day":"2024-01-02","price":"5.10",'
+                f'"key":"{key}","label":"Hello","1":"one"}}'
+            ).encode(),
+        )
+
+    def test_falls_back_for_unsupported_data(self):
+        """Test data orjson cannot encode is rendered by JSONRenderer."""
+        data = {'big': 2 ** 70}
+
+        self.assertEqual(self.renderer.render(data), b'{"big":%d}' % 2 ** 70)
+
+    def test_indented_output(self):
+        """Test indented output is rendered by JSONRenderer."""
+        data = sample_recipes(1)
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            self.renderer.render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+    def test_iter_render(self):
+        """Test streamed output is the same document as a full render."""
+        items = sample_recipes(7)['results']
+
+        chunks = list(self.renderer.iter_render(iter(items), chunk_size=3))
+
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(b''.join(chunks), self.renderer.render(items))
+        self.assertEqual(b''.join(self.renderer.iter_render([])), b'[]')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test the orjson parser."""
+
+    def setUp(self):
+        self.parser = ORJSONParser()
+
+    def test_parse(self):
+        """Test JSON is parsed into Python data."""
+        data = sample_recipes()
+        stream = io.BytesIO(ORJSONRenderer().render(data))
+
+        self.assertEqual(self.parser.parse(stream), data)
+
+    def test_parse_other_encoding(self):
+        """Test bodies in other encodings are decoded."""
+        stream = io.BytesIO('{"title": "Crème"}'.encode('latin-1'))
+
+        data = self.parser.parse(
+            stream,
+            parser_context={'encoding': 'latin-1'},
+        )
+
+        self.assertEqual(data, {'title': 'Crème'})
+
+    def test_invalid_json(self):
+        """Test invalid JSON and NaN are rejected."""
+        for body in (b'{"title": ', b'{"price": NaN}'):
+            with self.assertRaises(ParseError):
+                self.parser.parse(io.BytesIO(body))
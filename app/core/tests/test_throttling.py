@@ -0,0 +1,210 @@
+"""
+Tests for throttling.
+"""
+import threading
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import (
+    TokenBucketStore,
+    parse_rate,
+    throttle_store,
+)
+
+
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+
+REST_FRAMEWORK = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'read': '2/min', 'login': '1/min'},
+}
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class TokenBucketStoreTests(SimpleTestCase):
+    """Test the token bucket store."""
+
+    def test_parse_rate(self):
+        """Test rates are parsed into tokens per second and capacity."""
+        self.assertEqual(parse_rate('120/min'), (2, 120))
+        self.assertEqual(parse_rate('5/s'), (5, 5))
+
+    @patch('core.throttling.time.monotonic')
+    def test_bucket_allows_burst_then_refills(self, patched_monotonic):
+        """Test a bucket allows its capacity, then refills over time."""
+        patched_monotonic.return_value = 100.0
+        store = TokenBucketStore()
+
+        waits = [store.take('key', 1, 3) for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertAlmostEqual(waits[3], 1)
+        patched_monotonic.return_value = 101.5
+        self.assertEqual(store.take('key', 1, 3), 0)
+        self.assertAlmostEqual(store.take('key', 1, 3), 0.5)
+
+    def test_keys_have_separate_buckets(self):
+        """Test emptying one bucket does not affect another."""
+        store = TokenBucketStore()
+        store.take('one', 1, 1)
+
+        self.assertEqual(store.take('two', 1, 1), 0)
+        self.assertGreater(store.take('one', 1, 1), 0)
+
+    def test_store_is_bounded(self):
+        """Test the least recently used bucket is dropped when full."""
+        store = TokenBucketStore(shards=1, max_size=2)
+        store.take('one', 1, 1)
+        store.take('two', 1, 1)
+        store.take('three', 1, 1)
+
+        self.assertEqual(store.take('one', 1, 1), 0)
+        self.assertGreater(store.take('three', 1, 1), 0)
+
+    @patch('core.throttling.time.time')
+    def test_shared_cache(self, patched_time):
+        """Test stores with a shared cache count requests together."""
+        patched_time.return_value = 6030.0
+        caches['default'].clear()
+        first = TokenBucketStore(cache_alias='default')
+        second = TokenBucketStore(cache_alias='default')
+
+        self.assertEqual(first.take('key', 1, 60), 0)
+        for _ in range(59):
+            second.take('key', 1, 60)
+        self.assertEqual(first.take('key', 1, 60), 30)
+
+        patched_time.return_value = 6060.0
+        self.assertEqual(second.take('key', 1, 60), 0)
+
+    def test_shared_cache_is_atomic(self):
+        """Test concurrent requests cannot exceed a shared limit."""
+        caches['default'].clear()
+        store = TokenBucketStore(cache_alias='default')
+        waits = []
+
+        def take():
+            for _ in range(10):
+                waits.append(store.take('key', 1 / 60, 1))
+
+        workers = [threading.Thread(target=take) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertLessEqual(waits.count(0), 1)
+
+    def test_shared_scopes(self):
+        """Test only the shared scopes are counted in the cache."""
+        caches['default'].clear()
+        first = TokenBucketStore(
+            cache_alias='default',
+            shared_scopes=['login'],
+        )
+        second = TokenBucketStore(
+            cache_alias='default',
+            shared_scopes=['login'],
+        )
+
+        first.take('login:key', 1 / 60, 1, scope='login')
+        first.take('read:key', 1 / 60, 1, scope='read')
+
+        self.assertGreater(
+            second.take('login:key', 1 / 60, 1, scope='login'),
+            0,
+        )
+        self.assertEqual(second.take('read:key', 1 / 60, 1, scope='read'), 0)
+
+
+@override_settings(REST_FRAMEWORK=REST_FRAMEWORK)
+class TokenBucketThrottleTests(TestCase):
+    """Test throttling API requests."""
+
+    def setUp(self):
+        throttle_store.clear()
+        caches['default'].clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        throttle_store.clear()
+
+    def test_requests_over_rate_are_throttled(self):
+        """Test requests beyond the rate get 429 with Retry-After."""
+        for _ in range(2):
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+
+    def test_users_are_throttled_separately(self):
+        """Test one user's requests do not use up another's."""
+        for _ in range(3):
+            self.client.get(ME_URL)
+        other = APIClient()
+        other.force_authenticate(create_user(email='other@example.com'))
+
+        res = other.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_scope_without_rate_is_not_throttled(self):
+        """Test endpoint classes without a rate are not throttled."""
+        for _ in range(5):
+            res = self.client.patch(ME_URL, {'name': 'Name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_login_is_throttled_by_client(self):
+        """Test logins are throttled per client address."""
+        payload = {'email': self.user.email, 'password': 'testpass123'}
+        client = APIClient()
+
+        res = client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_login_ignores_spoofed_forwarded_for(self):
+        """Test clients cannot get new login buckets by sending XFF."""
+        payload = {'email': self.user.email, 'password': 'testpass123'}
+        client = APIClient()
+
+        res = client.post(
+            TOKEN_URL,
+            payload,
+            HTTP_X_FORWARDED_FOR='198.51.100.1, 203.0.113.7',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = client.post(
+            TOKEN_URL,
+            payload,
+            HTTP_X_FORWARDED_FOR='198.51.100.2, 203.0.113.7',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,172 @@
+"""
+Throttling classes for the APIs.
+"""
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from core.caches import SharedCacheMixin
+from core.options import get_options
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Return (tokens per second, capacity) for a rate like '100/min'."""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity / PERIODS[period[0]], capacity
+
+
+def _take(bucket, now, rate, capacity):
+    """Refill a (tokens, time) bucket and take a token from it.
+
+    Return the new bucket and 0, or the seconds until a token is due.
+    """
+    tokens, last = bucket
+    tokens = min(capacity, tokens + (now - last) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+
+    return (tokens, now), (1 - tokens) / rate
+
+
+class TokenBucketStore(SharedCacheMixin):
+    """Token buckets in process memory, split into locked shards.
+
+    Shards keep requests for different keys from waiting on one lock.
+    Each shard holds at most its share of ``max_size`` buckets and drops
+    the least recently used, which then starts full again.
+
+    When ``cache_alias`` names a Django cache, the scopes in
+    ``shared_scopes``, or all scopes if it is None, are counted there
+    instead, so that all workers share one limit. The cache's atomic
+    ``add`` and ``incr`` count requests in fixed windows of one rate
+    period, which lets at most ``capacity`` requests through per window
+    across workers.
+    """
+    key_prefix = 'throttle'
+
+    def __init__(self, shards=16, max_size=100000, cache_alias=None,
+                 shared_scopes=None):
+        self.cache_alias = cache_alias
+        self.shared_scopes = shared_scopes
+        self.shard_size = max(1, max_size // shards)
+        self._shards = [
+            (threading.Lock(), OrderedDict()) for _ in range(shards)
+        ]
+
+    def is_shared(self, scope):
+        """Return whether a scope is counted in the shared cache."""
+        if self.cache_alias is None:
+            return False
+
+        return self.shared_scopes is None or scope in self.shared_scopes
+
+    def take(self, key, rate, capacity, scope=None):
+        """Take a token from the bucket for a key.
+
+        Return 0 if one was available, else the seconds until one is.
+        """
+        if self.is_shared(scope):
+            return self._take_shared(key, rate, capacity)
+
+        now = time.monotonic()
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            bucket = buckets.pop(key, None) or (capacity, now)
+            buckets[key], wait = _take(bucket, now, rate, capacity)
+            if len(buckets) > self.shard_size:
+                buckets.popitem(last=False)
+
+        return wait
+
+    def _take_shared(self, key, rate, capacity):
+        """Count a request in the key's current window in the shared cache."""
+        window = capacity / rate
+        now = time.time()
+        index = int(now // window)
+        cache_key = f'{self.key_prefix}:{key}:{index}'
+        timeout = math.ceil(window) + 1
+        self.shared.add(cache_key, 0, timeout)
+        try:
+            count = self.shared.incr(cache_key)
+        except ValueError:
+            # The key expired between add and incr.
+            self.shared.add(cache_key, 1, timeout)
+            count = 1
+        if count <= capacity:
+            return 0
+
+        return (index + 1) * window - now
+
+    def clear(self):
+        """Remove every local bucket."""
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+
+def _throttle_store_from_settings():
+    """Create the bucket store from the THROTTLE_STORE setting."""
+    options = get_options('THROTTLE_STORE')
+    return TokenBucketStore(
+        shards=options.get('SHARDS', 16),
+        max_size=options.get('MAX_SIZE', 100000),
+        cache_alias=options.get('CACHE_ALIAS'),
+        shared_scopes=options.get('SHARED_SCOPES'),
+    )
+
+
+throttle_store = _throttle_store_from_settings()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle each user, or anonymous client IP, per endpoint class.
+
+    The endpoint class is the view's ``throttle_scope`` when set, such
+    as ``upload`` or ``login``, else ``read`` for safe methods and
+    ``write`` for the rest. Rates come from ``DEFAULT_THROTTLE_RATES``:
+    ``'100/min'`` allows bursts of 100 requests, refilled at 100 a
+    minute. Scopes without a rate are not throttled.
+    """
+    store = throttle_store
+    wait_seconds = None
+
+    def get_scope(self, request, view):
+        """Return the endpoint class of a request."""
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is not None:
+            return scope
+
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def allow_request(self, request, view):
+        """Return whether the request's bucket had a token."""
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        user = request.user
+        if user.is_authenticated:
+            key = f'{scope}:user:{user.pk}'
+        else:
+            key = f'{scope}:ip:{self.get_ident(request)}'
+        self.wait_seconds = self.store.take(
+            key, *parse_rate(rate), scope=scope,
+        )
+
+        return not self.wait_seconds
+
+    def wait(self):
+        """Return the seconds until the request would be allowed."""
+        return self.wait_seconds
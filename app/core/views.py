@@ -1,11 +1,47 @@
 """
 Core views for app.
 """
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    JsonResponse,
+)
+from django.utils.crypto import constant_time_compare
 
+from core.metrics import metrics
 
-@api_view(['GET'])
-def health_check(request):
-    """Returns successful response."""
-    return Response({'healthy': True})
+
+async def health_check(request):
+    """Returns successful response without leaving the event loop."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    return JsonResponse({'healthy': True})
+
+
+def metrics_view(request):
+    """Returns request metrics in the Prometheus text format.
+
+    Scrapers must send METRICS_TOKEN as a Bearer token. Without a token
+    the metrics are only served in DEBUG.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    token = settings.METRICS['TOKEN']
+    if token is None:
+        allowed = settings.DEBUG
+    else:
+        allowed = constant_time_compare(
+            request.headers.get('Authorization', ''),
+            f'Bearer {token}',
+        )
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,144 @@
+"""
+Per-user response caching for the recipe APIs.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.caches import is_shared
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from core.options import get_options
+
+
+def get_cache():
+    """Return the Django cache holding cached responses."""
+    options = get_options('RESPONSE_CACHE')
+    return caches[options.get('CACHE_ALIAS', 'default')]
+
+
+def is_enabled():
+    """Return whether responses are cached.
+
+    Unless ``ENABLED`` says otherwise, responses are only cached in a
+    cache that every worker shares, as other workers would not see a
+    version bump in a per-process cache and would serve stale data.
+    """
+    options = get_options('RESPONSE_CACHE')
+    enabled = options.get('ENABLED')
+    if enabled is None:
+        return is_shared(options.get('CACHE_ALIAS', 'default'))
+
+    return enabled
+
+
+def _version_key(user_id):
+    """Return the cache key holding the version for a user."""
+    return f'response-version:{user_id}'
+
+
+def get_version(user_id):
+    """Return the current cache version for a user's data."""
+    cache = get_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(user_id))
+
+    return version
+
+
+def bump_version(user_id):
+    """Invalidate every cached response for a user, on commit.
+
+    Bumping before the commit would let a concurrent request read the
+    old rows and cache them under the new version.
+    """
+    transaction.on_commit(
+        lambda: get_cache().set(_version_key(user_id), uuid.uuid4().hex, None)
+    )
+
+
+class CachedResponseMixin:
+    """Cache list and retrieve responses until the user's data changes.
+
+    Responses are stored under a per-user version that model signals bump
+    once their transaction commits, so that a response read before a
+    commit is never cached under the version that follows it. Each
+    response carries an ETag derived from the cache key, and a matching
+    If-None-Match is answered with 304 before the cache or database is
+    read. Nothing is cached unless the response cache is enabled.
+    """
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        """Return a cached response, calling handler on a miss."""
+        if not is_enabled():
+            return handler(request, *args, **kwargs)
+
+        user_id = request.user.id
+        url = request.build_absolute_uri()
+        key = f'response:{user_id}:{get_version(user_id)}:{url}'
+        etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = get_cache()
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(
+                    key,
+                    response.data,
+                    get_options('RESPONSE_CACHE').get('TIMEOUT'),
+                )
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_responses(sender, instance, **kwargs):
+    """Bump the response cache version for the owner of a changed object."""
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        bump_version(instance.user_id)
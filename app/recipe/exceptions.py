@@ -0,0 +1,21 @@
+"""
+Exceptions for the recipe APIs.
+"""
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    """The resource changed since the client last fetched it."""
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _('The recipe has been modified since it was fetched.')
+    default_code = 'precondition_failed'
+
+
+class RequestEntityTooLarge(APIException):
+    """The request body is larger than the server accepts."""
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Request body is too large.')
+    default_code = 'request_too_large'
@@ -0,0 +1,113 @@
+"""
+Streaming exports of recipes.
+"""
+import csv
+from itertools import islice
+
+from django.db import connections
+
+from core.renderers import ORJSONRenderer
+
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+    'csv': 'text/csv',
+}
+CSV_FIELDS = [
+    'id', 'title', 'description', 'time_minutes', 'price', 'link', 'tags',
+    'ingredients',
+]
+
+
+class Echo:
+    """File-like object returning what is written instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _cursor_chunks(queryset, chunk_size):
+    """Yield lists of rows read from a server-side cursor."""
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def _keyset_chunks(queryset, chunk_size):
+    """Yield lists of rows read with one query per chunk, by id."""
+    after = None
+    while True:
+        page = queryset if after is None else queryset.filter(id__gt=after)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+
+        yield chunk
+        after = chunk[-1]['id']
+
+
+def iter_recipes(queryset, serializer, after=None, chunk_size=2000):
+    """Yield serialized recipes in id order, a chunk at a time.
+
+    Rows come from a server-side cursor, and relations are loaded for
+    each chunk, so memory use does not grow with the number of recipes.
+    Passing the last exported id as ``after`` resumes an export.
+
+    Poolers in transaction mode cannot keep a cursor open between
+    transactions, so with DISABLE_SERVER_SIDE_CURSORS each chunk is a
+    separate query starting after the last id instead.
+    """
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    queryset = queryset.order_by('id').values(*serializer.columns)
+    settings_dict = connections[queryset.db].settings_dict
+    if settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        chunks = _keyset_chunks(queryset, chunk_size)
+    else:
+        chunks = _cursor_chunks(queryset, chunk_size)
+    for chunk in chunks:
+        yield from serializer.serialize(chunk)
+
+
+def iter_ndjson(recipes):
+    """Yield each recipe as a line of JSON."""
+    renderer = ORJSONRenderer()
+    for recipe in recipes:
+        yield renderer.render(recipe) + b'\n'
+
+
+def iter_csv(recipes, header=True):
+    """Yield a CSV header and a row for each recipe.
+
+    Tags and ingredients are written as semicolon separated names.
+    """
+    writer = csv.writer(Echo())
+    if header:
+        yield writer.writerow(CSV_FIELDS).encode()
+    for recipe in recipes:
+        row = dict(recipe)
+        for name in ('tags', 'ingredients'):
+            row[name] = ';'.join(item['name'] for item in recipe[name])
+        yield writer.writerow([row[name] for name in CSV_FIELDS]).encode()
+
+
+def iter_export(queryset, serializer, export_format, after=None,
+                chunk_size=2000):
+    """Yield an export of recipes in the given format as bytes.
+
+    Resumed CSV exports have no header, so they can be appended to the
+    interrupted file. A resumed JSON export is an array of the remaining
+    recipes.
+    """
+    recipes = iter_recipes(queryset, serializer, after, chunk_size)
+    if export_format == 'csv':
+        return iter_csv(recipes, header=after is None)
+    if export_format == 'json':
+        return ORJSONRenderer().iter_render(recipes)
+
+    return iter_ndjson(recipes)
@@ -0,0 +1,145 @@
+"""
+Read-only serialization of recipe data from ``.values()`` rows.
+"""
+from operator import itemgetter
+
+from django.db.models import F
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core.metrics import timed_serialization
+
+
+# Fields whose representation of a database value is the value itself.
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField)
+
+PARENT_KEY = 'fastpath_parent_id'
+
+
+class ValuesSerializer:
+    """Build the output of a model serializer from ``.values()`` rows.
+
+    The field objects of the given serializer are inspected once and
+    turned into plain accessors, so no field methods run per row for
+    integers and strings. Other fields use their own to_representation.
+    Many-to-many fields are loaded with one query per relation: ids come
+    from the through table, nested serializers from the related model.
+    The output matches what the serializer itself returns.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.accessors = []
+        self.relations = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if isinstance(field, serializers.ListSerializer):
+                self.relations[name] = self._nested_loader(
+                    field.source,
+                    ValuesSerializer(field.child),
+                )
+                self.accessors.append((name, None))
+            elif isinstance(field, serializers.ManyRelatedField):
+                self.relations[name] = self._ids_loader(field.source)
+                self.accessors.append((name, None))
+            else:
+                self.columns.append(field.source)
+                self.accessors.append((name, self._compile(field)))
+
+        if self.relations and 'id' not in self.columns:
+            self.columns.append('id')
+
+    def _compile(self, field):
+        """Return a function reading a field's output from a row."""
+        get = itemgetter(field.source)
+        if isinstance(field, IDENTITY_FIELDS):
+            return get
+
+        convert = field.to_representation
+
+        def accessor(row):
+            value = get(row)
+            return None if value is None else convert(value)
+
+        return accessor
+
+    def _ids_loader(self, source):
+        """Return a function loading related ids for parent ids."""
+        model_field = self.model._meta.get_field(source)
+        through = model_field.remote_field.through
+        parent = model_field.m2m_column_name()
+        target = model_field.m2m_reverse_name()
+
+        def load(ids):
+            related = {}
+            links = through.objects.filter(
+                **{f'{parent}__in': ids}
+            ).values_list(parent, target)
+            for parent_id, target_id in links:
+                related.setdefault(parent_id, []).append(target_id)
+
+            return related
+
+        return load
+
+    def _nested_loader(self, source, child):
+        """Return a function loading nested objects for parent ids."""
+        model_field = self.model._meta.get_field(source)
+        query_name = model_field.related_query_name()
+
+        def load(ids):
+            related = {}
+            rows = child.model.objects.filter(
+                **{f'{query_name}__in': ids}
+            ).values(*child.columns, **{PARENT_KEY: F(query_name)})
+            for row in rows:
+                related.setdefault(row[PARENT_KEY], []).append(
+                    child.to_representation(row)
+                )
+
+            return related
+
+        return load
+
+    def to_representation(self, row, related=None):
+        """Return the output for one row."""
+        data = {}
+        for name, accessor in self.accessors:
+            if accessor is None:
+                data[name] = related[name].get(row['id'], [])
+            else:
+                data[name] = accessor(row)
+
+        return data
+
+    @timed_serialization
+    def serialize(self, rows):
+        """Return the output for a list of rows."""
+        rows = list(rows)
+        related = {}
+        if self.relations:
+            ids = [row['id'] for row in rows]
+            related = {
+                name: load(ids) for name, load in self.relations.items()
+            }
+
+        return [self.to_representation(row, related) for row in rows]
+
+
+class ValuesListMixin:
+    """List objects through a ValuesSerializer of the view's serializer."""
+
+    def list(self, request, *args, **kwargs):
+        serializer = ValuesSerializer(self.get_serializer())
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *serializer.columns
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+
+        return Response(serializer.serialize(queryset))
@@ -0,0 +1,175 @@
+"""
+Background processing of recipe images.
+"""
+import io
+import os
+import threading
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+
+from PIL import (
+    Image,
+    ImageOps,
+    features,
+)
+
+from django.core.files.base import ContentFile
+from django.db import (
+    connections,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Recipe
+from core.options import get_options
+
+
+DEFAULT_SIZES = {'small': 320, 'large': 1280}
+
+
+def _formats():
+    """Return the (format, extension, save options) to render."""
+    jpeg_options = {'quality': 85, 'optimize': True, 'progressive': True}
+    formats = [('JPEG', 'jpg', jpeg_options)]
+    if features.check('webp'):
+        formats.insert(0, ('WEBP', 'webp', {'quality': 80, 'method': 4}))
+
+    return formats
+
+
+def _convert(image, image_format):
+    """Return the image in a mode the output format can store."""
+    if image_format == 'JPEG':
+        return image if image.mode == 'RGB' else image.convert('RGB')
+
+    return image if image.mode in ('RGB', 'RGBA') else image.convert('RGBA')
+
+
+def render_renditions(image_file, sizes):
+    """Return resized copies of an image as {key: (bytes, extension)}.
+
+    Orientation from EXIF is applied to the pixels, and no metadata is
+    written to the outputs.
+    """
+    renditions = {}
+    with Image.open(image_file) as original:
+        image = ImageOps.exif_transpose(original)
+        for name, size in sizes.items():
+            resized = image.copy()
+            resized.thumbnail((size, size))
+            for image_format, ext, options in _formats():
+                output = _convert(resized, image_format)
+                buffer = io.BytesIO()
+                output.save(buffer, image_format, **options)
+                renditions[f'{name}_{ext}'] = (buffer.getvalue(), ext)
+
+    return renditions
+
+
+def delete_files(storage, paths):
+    """Delete stored files, ignoring ones already gone."""
+    for path in paths:
+        storage.delete(path)
+
+
+def process_recipe_image(recipe_id, stale_paths=()):
+    """Generate and store renditions for a recipe's current image.
+
+    ``stale_paths`` are files of the image it replaced, deleted once the
+    new renditions are saved, or once they are no longer needed.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only('id', 'image').first()
+    if recipe is None or not recipe.image:
+        if recipe is not None:
+            delete_files(recipe.image.storage, stale_paths)
+        return {}
+
+    storage = recipe.image.storage
+    image_name = recipe.image.name
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    directory = os.path.join('uploads', 'recipe', 'renditions')
+    with recipe.image.open('rb') as image_file:
+        renditions = render_renditions(
+            image_file,
+            get_options('IMAGE_RENDITIONS').get('SIZES', DEFAULT_SIZES),
+        )
+
+    paths = {
+        key: storage.save(
+            os.path.join(directory, f'{stem}-{key}.{ext}'),
+            ContentFile(content),
+        )
+        for key, (content, ext) in renditions.items()
+    }
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_renditions=paths,
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        delete_files(storage, paths.values())
+        paths = {}
+    delete_files(storage, stale_paths)
+
+    return paths
+
+
+class ImagePipeline:
+    """Runs image processing on a pool of background threads.
+
+    The pool is created on first use so that it is not shared across
+    forked worker processes.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Return the thread pool, creating it if needed."""
+        with self._lock:
+            if self._executor is None:
+                options = get_options('IMAGE_RENDITIONS')
+                self._executor = ThreadPoolExecutor(
+                    max_workers=options.get('WORKERS', 2),
+                    thread_name_prefix='recipe-images',
+                )
+
+            return self._executor
+
+    def _run(self, recipe_id, stale_paths):
+        """Process an image, closing the thread's database connection.
+
+        Connections are closed even when persistent, as images are rare
+        enough that idle workers should not hold one.
+        """
+        try:
+            return process_recipe_image(recipe_id, stale_paths)
+        finally:
+            connections.close_all()
+
+    def submit(self, recipe_id, stale_paths=()):
+        """Process a recipe image and return a Future for the result."""
+        if get_options('IMAGE_RENDITIONS').get('EAGER', False):
+            future = Future()
+            future.set_result(process_recipe_image(recipe_id, stale_paths))
+            return future
+
+        return self._get_executor().submit(self._run, recipe_id, stale_paths)
+
+    def schedule(self, recipe_id, stale_paths=()):
+        """Process a recipe image once the current transaction commits."""
+        transaction.on_commit(lambda: self.submit(recipe_id, stale_paths))
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+pipeline = ImagePipeline()
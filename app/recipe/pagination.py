@@ -0,0 +1,25 @@
+"""
+Pagination classes for the recipe APIs.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes, seeking on the primary key."""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """Return the view's ordering for this request, if it has one."""
+        get_ordering = getattr(view, 'get_ordering', None)
+        if get_ordering is not None:
+            return get_ordering()
+
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination for tags and ingredients, seeking on the name."""
+    ordering = '-name'
@@ -0,0 +1,66 @@
+"""
+Full-text search for recipes.
+"""
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connections
+from django.db.models import (
+    F,
+    FloatField,
+    IntegerField,
+    Value,
+)
+from django.db.models.functions import Cast
+
+from core.models import SEARCH_CONFIG
+
+
+# Ranks are stored as integers so that cursors can seek on exact values.
+RANK_SCALE = 1000000
+
+_trigram_available = {}
+
+
+def trigram_available(using='default'):
+    """Return whether the pg_trgm extension is installed."""
+    connection = connections[using]
+    # Keyed by database name too, as tests swap in a test database.
+    key = (using, connection.settings_dict['NAME'])
+    if key not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_available[key] = cursor.fetchone() is not None
+
+    return _trigram_available[key]
+
+
+def _scaled(score):
+    """Return a relevance score as a scaled integer."""
+    return Cast(
+        score * Value(RANK_SCALE, output_field=FloatField()),
+        IntegerField(),
+    )
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching the search text, annotated with a rank.
+
+    Matching uses the GIN indexed search vector with web search syntax.
+    If nothing matches and pg_trgm is installed, titles similar to the
+    text are returned instead so that typos still find results.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    matches = queryset.filter(search_vector=query)
+    if trigram_available(queryset.db) and not matches.exists():
+        return queryset.filter(title__trigram_similar=text).annotate(
+            rank=_scaled(TrigramSimilarity('title', text)),
+        )
+
+    return matches.annotate(
+        rank=_scaled(SearchRank(F('search_vector'), query)),
+    )
@@ -1,6 +1,9 @@
 """
 Serializers for recipe APIs
 """
+from django.db import transaction
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
 
 from core.models import (
@@ -8,9 +11,30 @@ from core.models import (
     Tag,
     Ingredient,
 )
+from core.signals import marking_link_changes
+from recipe.cache import bump_version
+
+
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for recipe attributes."""
+
+    def validate_name(self, value):
+        """Reject renaming to a name the user already has."""
+        if self.instance is None:
+            return value
 
+        duplicates = self.Meta.model.objects.filter(
+            user=self.instance.user,
+            name=value,
+        ).exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            msg = _('An item with this name already exists.')
+            raise serializers.ValidationError(msg, code='unique')
 
-class IngredientSerializer(serializers.ModelSerializer):
+        return value
+
+
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -19,7 +43,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -28,46 +52,145 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Field returning URLs for each processed image rendition."""
+
+    def to_representation(self, value):
+        storage = Recipe._meta.get_field('image').storage
+        request = self.context.get('request')
+        urls = {}
+        for key, path in value.items():
+            url = storage.url(path)
+            urls[key] = request.build_absolute_uri(url) if request else url
+
+        return urls
+
+
 class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer for recipes."""
+    """Serializer for recipes.
+
+    Pass ``fields`` to output only some fields, and ``expand`` to choose
+    which of the relations are nested. Relations that are output but not
+    expanded are rendered as lists of ids.
+    """
+    relations = ('tags', 'ingredients')
+
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
         fields = [
             'id', 'title', 'time_minutes', 'price', 'link', 'tags',
-            'ingredients',
+            'ingredients', 'image_renditions',
         ]
         read_only_fields = ['id']
 
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if expand is not None:
+            for name in set(self.relations) - set(expand):
+                if name in self.fields:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(
+                        many=True,
+                        read_only=True,
+                    )
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serializer for creating many recipes at once."""
+
+    def _link_objs(self, recipes, model, through, field, items_per_recipe):
+        """Link each recipe to its named objects with one bulk insert."""
+        all_items = [item for items in items_per_recipe for item in items]
+        objs = {
+            obj.name: obj
+            for obj in self.child._get_or_create_objs(model, all_items)
+        }
+        links = dict.fromkeys(
+            (recipe.id, objs[item['name']].id)
+            for recipe, items in zip(recipes, items_per_recipe)
+            for item in items
+        )
+        through.objects.bulk_create(
+            through(recipe_id=recipe_id, **{f'{field}_id': obj_id})
+            for recipe_id, obj_id in links
+        )
+        bump_version(self.context['request'].user.id)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create recipes and their links using bulk inserts."""
+        auth_user = self.context['request'].user
+        tags = [item.pop('tags', []) for item in validated_data]
+        ingredients = [item.pop('ingredients', []) for item in validated_data]
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=auth_user, **item) for item in validated_data
+        )
+        self._link_objs(recipes, Tag, Recipe.tags.through, 'tag', tags)
+        self._link_objs(
+            recipes,
+            Ingredient,
+            Recipe.ingredients.through,
+            'ingredient',
+            ingredients,
+        )
+
+        return recipes
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description']
+        list_serializer_class = RecipeListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
+    def _get_or_create_objs(self, model, items):
+        """Return objects for the given names, creating missing ones."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        names = list(dict.fromkeys(item['name'] for item in items))
+        if not names:
+            return []
+
+        objs = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [name for name in names if name not in objs]
+        if missing:
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing],
+                ignore_conflicts=True,
             )
-            recipe.tags.add(tag_obj)
+            bump_version(auth_user.id)
+            objs.update(
+                (obj.name, obj)
+                for obj in model.objects.filter(
+                    user=auth_user,
+                    name__in=missing,
+                )
+            )
+
+        return [objs[name] for name in names]
+
+    def _get_or_create_tags(self, tags, recipe):
+        """Handle getting or creating tags as needed."""
+        tag_objs = self._get_or_create_objs(Tag, tags)
+        if tag_objs:
+            recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_objs = self._get_or_create_objs(Ingredient, ingredients)
+        if ingredient_objs:
+            recipe.ingredients.add(*ingredient_objs)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop('tags', [])
@@ -78,29 +201,100 @@ class RecipeDetailSerializer(RecipeSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Update recipe."""
+        """Update recipe, bumping its version once if anything changed.
+
+        The caller is expected to have locked the recipe's row.
+        """
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+        with marking_link_changes(instance):
+            if tags is not None:
+                instance.tags.set(self._get_or_create_objs(Tag, tags))
+            if ingredients is not None:
+                instance.ingredients.set(
+                    self._get_or_create_objs(Ingredient, ingredients)
+                )
+            links_changed = instance._links_changed
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        changed = [
+            attr for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
 
-        instance.save()
+        if changed or links_changed:
+            instance.save(update_fields=changed)
         return instance
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
 
+    image_renditions = ImageRenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_renditions']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+    def update(self, instance, validated_data):
+        """Update the image, writing only the image fields."""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class RecipeBatchOperationSerializer(serializers.Serializer):
+    """Serializer for a single operation in a recipe batch."""
+    op = serializers.ChoiceField(
+        choices=['create', 'update', 'partial_update', 'delete'],
+    )
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        """Require an id for operations on existing recipes."""
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            msg = _('This field is required.')
+            raise serializers.ValidationError({'id': msg}, code='required')
+
+        return attrs
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """Serializer for a batch of recipe operations."""
+    operations = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+    def validate_operations(self, operations):
+        """Reject batches that operate on the same recipe more than once.
+
+        Operations run in order, so a later one could act on a recipe an
+        earlier one deleted, while both report success.
+        """
+        seen = set()
+        duplicates = []
+        for operation in operations:
+            if operation.get('op') == 'create' or 'id' not in operation:
+                continue
+
+            recipe_id = str(operation['id'])
+            if recipe_id in seen and recipe_id not in duplicates:
+                duplicates.append(recipe_id)
+            seen.add(recipe_id)
+
+        if duplicates:
+            msg = _('Recipes can only appear once per batch: {ids}.').format(
+                ids=', '.join(duplicates),
+            )
+            raise serializers.ValidationError(msg, code='duplicate')
+
+        return operations
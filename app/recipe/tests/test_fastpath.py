@@ -0,0 +1,105 @@
+"""
+Tests for the fast-path recipe serialization.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+from recipe.fastpath import ValuesSerializer
+from recipe.serializers import (
+    IngredientSerializer,
+    RecipeSerializer,
+    TagSerializer,
+)
+
+
+class ValuesSerializerTests(TestCase):
+    """Test output from .values() rows matches the serializers."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.context = {'request': APIRequestFactory().get('/')}
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(3)
+        ]
+        for i in range(4):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe "{i}" é',
+                time_minutes=i * 7,
+                price=Decimal('1.10') * (i + 1),
+                link='' if i % 2 else 'https://example.com/recipe',
+                image_renditions=(
+                    {'small_jpg': f'uploads/recipe/renditions/{i}.jpg'}
+                    if i % 2 else {}
+                ),
+            )
+            recipe.tags.set(tags[:i])
+            recipe.ingredients.set(ingredients[i:])
+
+    def assertSameOutput(self, serializer_class, queryset, **kwargs):
+        """Assert both serialization paths render identical JSON."""
+        renderer = JSONRenderer()
+        expected = serializer_class(
+            queryset,
+            many=True,
+            context=self.context,
+            **kwargs,
+        ).data
+        fast = ValuesSerializer(
+            serializer_class(context=self.context, **kwargs)
+        )
+        actual = fast.serialize(queryset.values(*fast.columns))
+
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_recipe_output_identical(self):
+        """Test recipes with nested relations render identically."""
+        self.assertSameOutput(
+            RecipeSerializer,
+            Recipe.objects.order_by('id'),
+        )
+
+    def test_recipe_sparse_output_identical(self):
+        """Test recipes with some fields and id relations render the same."""
+        self.assertSameOutput(
+            RecipeSerializer,
+            Recipe.objects.order_by('-id'),
+            fields=['price', 'tags', 'ingredients', 'title'],
+            expand=['ingredients'],
+        )
+
+    def test_tag_and_ingredient_output_identical(self):
+        """Test tags and ingredients render identically."""
+        self.assertSameOutput(TagSerializer, Tag.objects.order_by('-name'))
+        self.assertSameOutput(
+            IngredientSerializer,
+            Ingredient.objects.order_by('-name'),
+        )
+
+    def test_relations_loaded_in_one_query_each(self):
+        """Test rows and each relation are loaded with a single query."""
+        fast = ValuesSerializer(RecipeSerializer(context=self.context))
+
+        with self.assertNumQueries(3):
+            data = fast.serialize(Recipe.objects.values(*fast.columns))
+
+        self.assertEqual(len(data), 4)
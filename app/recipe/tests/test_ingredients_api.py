@@ -3,9 +3,13 @@ Tests for the ingredients API.
 """
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import (
+    TestCase,
+    override_settings,
+)
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -62,7 +66,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test list of ingredients is limited to authenticated user."""
@@ -73,9 +77,9 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
 
     def test_update_ingredient(self):
         """Test updating an ingredient."""
@@ -89,6 +93,19 @@ class PrivateIngredientsApiTests(TestCase):
         ingredient.refresh_from_db()
         self.assertEqual(ingredient.name, payload['name'])
 
+    def test_update_ingredient_duplicate_name_error(self):
+        """Test renaming to an existing name returns an error."""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        ingredient = Ingredient.objects.create(user=self.user, name='Pepper')
+
+        payload = {'name': 'Salt'}
+        url = detail_url(ingredient.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'Pepper')
+
     def test_delete_ingredient(self):
         """Test deleting an ingredient."""
         ingredient = Ingredient.objects.create(user=self.user, name='Lettuce')
@@ -116,8 +133,8 @@ class PrivateIngredientsApiTests(TestCase):
 
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list."""
@@ -140,4 +157,37 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_ingredient(self):
+        """Test retrieving a single ingredient."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.get(detail_url(ingredient.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, IngredientSerializer(ingredient).data)
+
+    @override_settings(
+        RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': True},
+    )
+    def test_list_cache_invalidated_by_recipe_create(self):
+        """Test ingredients created through a recipe appear in the list."""
+        self.client.get(INGREDIENTS_URL)
+
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 20,
+            'price': '4.00',
+            'ingredients': [{'name': 'Leek'}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('recipe:recipe-batch'),
+                {'operations': [{'op': 'create', 'data': payload}]},
+                format='json',
+            )
+        res = self.client.get(INGREDIENTS_URL)
+
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(names, ['Leek'])
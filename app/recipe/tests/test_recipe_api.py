@@ -2,16 +2,29 @@
 Tests for recipe APIs.
 """
 from decimal import Decimal
+from unittest.mock import patch
+import csv
+import io
+import json
 import tempfile
+import threading
 import os
 
 from PIL import Image
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
 
 from core.models import (
@@ -20,13 +33,22 @@ from core.models import (
     Ingredient,
 )
 
+from recipe.exceptions import RequestEntityTooLarge
+from recipe.images import (
+    ImagePipeline,
+    render_renditions,
+)
+from recipe.search import trigram_available
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
 )
+from recipe.uploads import StreamingImageUploadHandler
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BATCH_URL = reverse('recipe:recipe-batch')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def detail_url(recipe_id):
@@ -90,7 +112,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
@@ -103,7 +125,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test get recipe detail."""
@@ -395,9 +417,9 @@ class PrivateRecipeApiTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -415,9 +437,1045 @@ class PrivateRecipeApiTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_all_tags(self):
+        """Test filtering recipes that have all of the given tags."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        r1 = create_recipe(user=self.user, title='Lentil Curry')
+        r1.tags.add(tag1, tag2)
+        r2 = create_recipe(user=self.user, title='Vegan Brownies')
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match_all': 1}
+        res = self.client.get(RECIPES_URL, params)
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filter_by_all_ingredients(self):
+        """Test filtering recipes that have all of the given ingredients."""
+        in1 = Ingredient.objects.create(user=self.user, name='Eggs')
+        in2 = Ingredient.objects.create(user=self.user, name='Flour')
+        r1 = create_recipe(user=self.user, title='Pancakes')
+        r1.ingredients.add(in1, in2)
+        r2 = create_recipe(user=self.user, title='Omelette')
+        r2.ingredients.add(in1)
+
+        params = {'ingredients': f'{in1.id},{in2.id}', 'match_all': 1}
+        res = self.client.get(RECIPES_URL, params)
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def test_invalid_match_all(self):
+        """Test a match_all value other than 0 or 1 returns an error."""
+        res = self.client.get(RECIPES_URL, {'match_all': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('match_all', res.data)
+
+    def test_filter_by_tags_returns_unique_recipes(self):
+        """Test a recipe matching several tags is only returned once."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        recipe = create_recipe(user=self.user, title='Lentil Curry')
+        recipe.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(RECIPES_URL, params)
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe.id])
+
+    def test_create_recipe_with_duplicate_names(self):
+        """Test repeated names in a payload create a single object."""
+        payload = {
+            'title': 'Thai Prawn Curry',
+            'time_minutes': 30,
+            'price': Decimal('2.50'),
+            'tags': [{'name': 'Thai'}, {'name': 'Thai'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+
+class RecipePaginationTests(TestCase):
+    """Test cursor pagination of the recipe list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_recipes_paginated(self):
+        """Test the recipe list is split into pages by cursor."""
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        self.assertIsNotNone(res.data['next'])
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipes[4].id, recipes[3].id])
+
+    def test_follow_cursor_returns_all_recipes(self):
+        """Test following next links returns every recipe once in order."""
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        ids = []
+        url = f'{RECIPES_URL}?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_next_page_query_count(self):
+        """Test a later page uses the same number of queries as the first."""
+        for i in range(5):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        with self.assertNumQueries(3):
+            self.client.get(res.data['next'])
+
+
+class RecipeSearchTests(TestCase):
+    """Test full-text search of recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        """Return the ids of recipes found by a search."""
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test searching matches words in titles and descriptions."""
+        r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
+        r2 = create_recipe(
+            user=self.user,
+            title='Rice bowl',
+            description='Served with a mild curry sauce.',
+        )
+        create_recipe(user=self.user, title='Fish pie')
+
+        ids = self._search('curries')
+
+        self.assertEqual(set(ids), {r1.id, r2.id})
+
+    def test_search_ranks_title_matches_first(self):
+        """Test title matches are ranked above description matches."""
+        r1 = create_recipe(
+            user=self.user,
+            title='Rice bowl',
+            description='Served with a mild curry sauce.',
+        )
+        r2 = create_recipe(user=self.user, title='Curry', description='')
+
+        self.assertEqual(self._search('curry'), [r2.id, r1.id])
+
+    def test_search_web_syntax(self):
+        """Test quoted phrases and excluded words are supported."""
+        r1 = create_recipe(user=self.user, title='Green curry paste')
+        create_recipe(user=self.user, title='Curry with green beans')
+
+        self.assertEqual(self._search('"green curry"'), [r1.id])
+        self.assertEqual(self._search('curry -beans'), [r1.id])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the authenticated user's recipes."""
+        other_user = create_user(email='other@example.com', password='test123')
+        create_recipe(user=other_user, title='Curry')
+
+        self.assertEqual(self._search('curry'), [])
+
+    def test_search_paginated(self):
+        """Test following next links returns every match once in order."""
+        recipes = [
+            create_recipe(
+                user=self.user,
+                title='Curry' if i % 2 else 'Rice',
+                description='curry',
+            )
+            for i in range(5)
+        ]
+
+        ids = []
+        url = f'{RECIPES_URL}?search=curry&page_size=2'
+        while url:
+            res = self.client.get(url)
+            ids.extend(item['id'] for item in res.data['results'])
+            url = res.data['next']
+
+        expected = sorted(
+            recipes,
+            key=lambda recipe: (recipe.title == 'Curry', recipe.id),
+            reverse=True,
+        )
+        self.assertEqual(ids, [recipe.id for recipe in expected])
+
+    def test_search_vector_updated_on_save(self):
+        """Test editing a recipe updates what it is found by."""
+        recipe = create_recipe(user=self.user, title='Fish pie')
+
+        recipe.title = 'Fish curry'
+        recipe.save()
+
+        self.assertEqual(self._search('curry'), [recipe.id])
+        self.assertEqual(self._search('pie'), [])
+
+    def test_search_uses_index(self):
+        """Test the search vector GIN index can serve searches."""
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = Recipe.objects.filter(search_vector='curry').explain()
+
+        self.assertIn('core_recipe_search_idx', plan)
+
+    def test_search_typo_falls_back_to_trigrams(self):
+        """Test a misspelt search finds recipes with similar titles."""
+        if not trigram_available():
+            self.skipTest('pg_trgm is not installed.')
+        recipe = create_recipe(user=self.user, title='Spaghetti bolognese')
+
+        self.assertEqual(self._search('spagetti bolognase'), [recipe.id])
+
+
+class RecipeRangeFilterTests(TestCase):
+    """Test numeric range filters and ordering of recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.quick = create_recipe(
+            user=self.user, time_minutes=15, price=Decimal('4.50'),
+        )
+        self.medium = create_recipe(
+            user=self.user, time_minutes=30, price=Decimal('9.99'),
+        )
+        self.slow = create_recipe(
+            user=self.user, time_minutes=90, price=Decimal('25.00'),
+        )
+
+    def _list_ids(self, **params):
+        """Return the ids of recipes listed with the given parameters."""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def _list_plan(self, **params):
+        """Return the query plan of the recipe list query."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL, params)
+        sql = next(
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "core_recipe"."id"')
+        )
+        with connection.cursor() as cursor:
+            # The tables are tiny, so rule out plans that only win at
+            # that size: full scans, and sorting rows after the scan.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_filter_time_minutes(self):
+        """Test filtering by a maximum time."""
+        ids = self._list_ids(time_minutes__lte=30)
+
+        self.assertEqual(ids, [self.medium.id, self.quick.id])
+
+    def test_filter_price_range(self):
+        """Test filtering by an inclusive price range."""
+        ids = self._list_ids(price__range='9.99,25')
+
+        self.assertEqual(ids, [self.slow.id, self.medium.id])
+
+    def test_filter_combined(self):
+        """Test combining time and price filters."""
+        ids = self._list_ids(time_minutes__gt=15, price__lt=10)
+
+        self.assertEqual(ids, [self.medium.id])
+
+    def test_invalid_filter_value(self):
+        """Test invalid filter values return an error."""
+        for params in (
+            {'time_minutes__lte': 'soon'},
+            {'price__range': '1'},
+            {'price__gte': 'cheap'},
+        ):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+    def test_ordering(self):
+        """Test sorting by time and price in either direction."""
+        self.assertEqual(
+            self._list_ids(ordering='time_minutes'),
+            [self.quick.id, self.medium.id, self.slow.id],
+        )
+        self.assertEqual(
+            self._list_ids(ordering='-price'),
+            [self.slow.id, self.medium.id, self.quick.id],
+        )
+
+    def test_invalid_ordering(self):
+        """Test sorting by an unsupported field returns an error."""
+        res = self.client.get(RECIPES_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_paginated(self):
+        """Test following next links when sorting with ties."""
+        extra = create_recipe(
+            user=self.user, time_minutes=30, price=Decimal('1.00'),
+        )
+
+        ids = []
+        url = f'{RECIPES_URL}?ordering=time_minutes&page_size=1'
+        while url:
+            res = self.client.get(url)
+            ids.extend(item['id'] for item in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(
+            ids,
+            [self.quick.id, self.medium.id, extra.id, self.slow.id],
+        )
+
+    def test_time_filter_uses_index(self):
+        """Test sorting and filtering by time uses the composite index."""
+        plan = self._list_plan(time_minutes__lte=30, ordering='time_minutes')
+
+        self.assertIn('core_recipe_user_time_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_price_filter_uses_index(self):
+        """Test sorting and filtering by price uses the composite index."""
+        plan = self._list_plan(price__range='5,20', ordering='-price')
+
+        self.assertIn('core_recipe_user_price_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+
+class RecipeSparseFieldsetTests(TestCase):
+    """Test choosing the fields returned by the recipe list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(self.tag)
+
+    def test_default_fields_unchanged(self):
+        """Test all fields are returned with nested relations by default."""
+        res = self.client.get(RECIPES_URL)
+
+        recipe = Recipe.objects.get(id=self.recipe.id)
+        serializer = RecipeSerializer(recipe)
+        self.assertEqual(res.data['results'], [serializer.data])
+
+    def test_default_fields_skip_unused_columns(self):
+        """Test the list does not load columns it does not return."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+
+        recipe_sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('"description"', recipe_sql)
+        self.assertNotIn('"search_vector"', recipe_sql)
+
+    def test_fields(self):
+        """Test only the requested fields are returned."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': self.recipe.title}],
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"price"', queries.captured_queries[0]['sql'])
+
+    def test_fields_relation_as_ids(self):
+        """Test relations are returned as ids unless expanded."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,tags'})
+
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'tags': [self.tag.id]}],
+        )
+
+    def test_expand(self):
+        """Test expanded relations are nested and included."""
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': 'id,ingredients', 'expand': 'tags'},
+        )
+
+        self.assertEqual(
+            res.data['results'],
+            [{
+                'id': self.recipe.id,
+                'ingredients': [],
+                'tags': [{'id': self.tag.id, 'name': self.tag.name}],
+            }],
+        )
+
+    def test_fields_paginated_with_ordering(self):
+        """Test following next links when the sort field is not listed."""
+        other = create_recipe(user=self.user, time_minutes=5)
+
+        ids = []
+        url = f'{RECIPES_URL}?fields=id&ordering=time_minutes&page_size=1'
+        while url:
+            res = self.client.get(url)
+            ids.extend(item['id'] for item in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(ids, [other.id, self.recipe.id])
+
+    def test_invalid_fields(self):
+        """Test unknown fields and relations return an error."""
+        for params in ({'fields': 'id,secret'}, {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+
+class RecipeExportTests(TestCase):
+    """Test streaming exports of recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(
+                user=self.user,
+                title=f'Recipe {i}',
+                description='Line one\nLine, two',
+            )
+            for i in range(5)
+        ]
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipes[0].tags.add(tag)
+
+    def _export(self, **params):
+        """Return the streamed response and body of an export."""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test recipes are exported as one JSON object per line."""
+        other_user = create_user(email='other@example.com', password='test123')
+        create_recipe(user=other_user)
+
+        res, body = self._export()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in body.splitlines()]
+        serializer = RecipeDetailSerializer(
+            Recipe.objects.filter(user=self.user).order_by('id'),
+            many=True,
+        )
+        self.assertEqual(lines, json.loads(json.dumps(serializer.data)))
+
+    def test_export_json(self):
+        """Test recipes are exported as a streamed JSON array."""
+        _, expected = self._export()
+
+        res, body = self._export(export_format='json')
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(
+            json.loads(body),
+            [json.loads(line) for line in expected.splitlines()],
+        )
+
+    def test_export_csv(self):
+        """Test recipes are exported as CSV with a header row."""
+        res, body = self._export(export_format='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(
+            [int(row['id']) for row in rows],
+            [recipe.id for recipe in self.recipes],
+        )
+        self.assertEqual(rows[0]['tags'], 'Vegan')
+        self.assertEqual(rows[0]['description'], 'Line one\nLine, two')
+        self.assertEqual(rows[0]['price'], '5.25')
+
+    def test_export_resume(self):
+        """Test an export resumes after the given id."""
+        _, body = self._export(after=self.recipes[2].id)
+        ids = [json.loads(line)['id'] for line in body.splitlines()]
+        self.assertEqual(ids, [self.recipes[3].id, self.recipes[4].id])
+
+        _, body = self._export(export_format='csv', after=self.recipes[3].id)
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual([row[0] for row in rows], [str(self.recipes[4].id)])
+
+    def test_export_queries_per_chunk(self):
+        """Test relations are loaded once per chunk of recipes."""
+        with patch('recipe.views.RecipeViewSet.export_chunk_size', 2):
+            res = self.client.get(EXPORT_URL)
+            with self.assertNumQueries(1 + 3 * 2):
+                b''.join(res.streaming_content)
+
+    def test_export_without_server_side_cursors(self):
+        """Test exports page by id when server-side cursors are off."""
+        _, expected = self._export()
+
+        with patch.dict(
+            connection.settings_dict,
+            {'DISABLE_SERVER_SIDE_CURSORS': True},
+        ), patch('recipe.views.RecipeViewSet.export_chunk_size', 2):
+            res = self.client.get(EXPORT_URL)
+            with self.assertNumQueries(4 + 3 * 2):
+                body = b''.join(res.streaming_content).decode()
+
+        self.assertEqual(body, expected)
+
+    def test_export_invalid_params(self):
+        """Test invalid formats and cursors return an error."""
+        for params in ({'export_format': 'xml'}, {'after': 'last'}):
+            res = self.client.get(EXPORT_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+
+class RecipeConditionalRequestTests(TestCase):
+    """Test conditional requests on recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_retrieve_sets_validators(self):
+        """Test recipe detail responses carry ETag and Last-Modified."""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res['ETag'], f'"{self.recipe.id}-1"')
+        self.assertIn('Last-Modified', res)
+
+    def test_retrieve_if_none_match(self):
+        """Test a current ETag returns 304 without loading nested data."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id),
+                HTTP_IF_NONE_MATCH=etag,
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_retrieve_if_modified_since(self):
+        """Test If-Modified-Since returns 304 for an unchanged recipe."""
+        last_modified = self.client.get(
+            detail_url(self.recipe.id),
+        )['Last-Modified']
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_changes_etag(self):
+        """Test updating a recipe or its tags changes its ETag."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        res = self.client.patch(detail_url(self.recipe.id), {'title': 'New'})
+        self.assertNotEqual(res['ETag'], etag)
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipe.tags.add(tag)
+        self.assertNotEqual(
+            self.client.get(detail_url(self.recipe.id))['ETag'],
+            etag,
+        )
+
+    def test_update_bumps_version_once(self):
+        """Test an update of fields and links bumps the version once."""
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        self.recipe.tags.add(tag)
+        self.recipe.refresh_from_db()
+        version = self.recipe.version
+        payload = {
+            'title': 'New',
+            'tags': [{'name': 'Dinner'}],
+            'ingredients': [{'name': 'Salt'}],
+        }
+
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            payload,
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.version, version + 1)
+        self.assertEqual(res['ETag'], f'"{self.recipe.id}-{version + 1}"')
+
+    def test_noop_update_keeps_etag(self):
+        """Test an update that changes nothing keeps the ETag."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {'title': self.recipe.title, 'tags': []},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['ETag'], etag)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.version, 1)
+
+    def test_tag_rename_changes_etag(self):
+        """Test renaming a tag changes the ETag of recipes using it."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipe.tags.add(tag)
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        tag.name = 'Supper'
+        tag.save()
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Supper')
+
+    def test_update_if_match(self):
+        """Test updates succeed only with the current ETag."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.client.patch(detail_url(self.recipe.id), {'title': 'First'})
+
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {'title': 'Second'},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_412_PRECONDITION_FAILED,
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'First')
+
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {'title': 'Second'},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Second')
+
+    def test_list_if_none_match(self):
+        """Test an unchanged list page returns 304 in a single query."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_recipe(user=self.user, title='Another')
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the number of queries used by the recipe APIs."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _create_recipes(self, count):
+        """Create recipes with tags and ingredients attached."""
+        recipes = []
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            tag = Tag.objects.create(user=self.user, name=f'Tag {recipe.id}')
+            ingredient = Ingredient.objects.create(
+                user=self.user,
+                name=f'Ingredient {recipe.id}',
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_list_recipes_query_count(self):
+        """Test listing recipes uses a fixed number of queries."""
+        self._create_recipes(5)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+        for item in res.data['results']:
+            self.assertEqual(len(item['tags']), 1)
+            self.assertEqual(len(item['ingredients']), 1)
+
+    def test_list_recipes_query_count_constant(self):
+        """Test query count does not grow with the number of recipes."""
+        self._create_recipes(1)
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+        self._create_recipes(10)
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+    def test_filtered_list_query_count(self):
+        """Test filtering recipes uses a fixed number of queries."""
+        recipes = self._create_recipes(5)
+        tag_ids = ','.join(
+            str(recipe.tags.first().id) for recipe in recipes[:3]
+        )
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL, {'tags': tag_ids})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_retrieve_recipe_query_count(self):
+        """Test retrieving a recipe uses a fixed number of queries."""
+        recipe = self._create_recipes(1)[0]
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+    def _create_payload(self, count):
+        """Return a recipe payload with the given number of ingredients."""
+        return {
+            'title': 'Big Salad',
+            'time_minutes': 15,
+            'price': Decimal('9.00'),
+            'tags': [{'name': 'Lunch'}, {'name': 'Vegan'}],
+            'ingredients': [
+                {'name': f'Ingredient {i}'} for i in range(count)
+            ],
+        }
+
+    def test_create_recipe_query_count_constant(self):
+        """Test creating a recipe uses a fixed number of queries."""
+        with CaptureQueriesContext(connection) as small:
+            res = self.client.post(
+                RECIPES_URL,
+                self._create_payload(1),
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        Recipe.objects.all().delete()
+        Ingredient.objects.all().delete()
+        Tag.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(
+                RECIPES_URL,
+                self._create_payload(30),
+                format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['ingredients']), 30)
+        self.assertEqual(len(large), len(small))
+
+    def _recipe_with_tags(self, count, prefix='Tag'):
+        """Create a recipe with the given number of tags."""
+        recipe = create_recipe(user=self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=f'{prefix} {i}')
+            for i in range(count)
+        ]
+        recipe.tags.add(*tags)
+
+        return recipe, [{'name': tag.name} for tag in tags]
+
+    def _through_writes(self, queries):
+        """Return write queries against the recipe tags table."""
+        table = Recipe.tags.through._meta.db_table
+        return [
+            query['sql'] for query in queries
+            if table in query['sql']
+            and query['sql'].startswith(('INSERT', 'DELETE', 'UPDATE'))
+        ]
+
+    def test_noop_tag_update_writes_nothing(self):
+        """Test updating with unchanged tags leaves the links untouched."""
+        recipe, payload_tags = self._recipe_with_tags(3)
+        link_ids = set(
+            Recipe.tags.through.objects.filter(
+                recipe=recipe,
+            ).values_list('id', flat=True)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                detail_url(recipe.id),
+                {'tags': payload_tags},
+                format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._through_writes(queries), [])
+        self.assertEqual(
+            set(
+                Recipe.tags.through.objects.filter(
+                    recipe=recipe,
+                ).values_list('id', flat=True)
+            ),
+            link_ids,
+        )
+
+    def test_noop_tag_update_query_count_constant(self):
+        """Test a no-op tag update does not scale with the tag count."""
+        recipe, payload_tags = self._recipe_with_tags(1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.patch(
+                detail_url(recipe.id),
+                {'tags': payload_tags},
+                format='json',
+            )
+
+        recipe, payload_tags = self._recipe_with_tags(20, prefix='Other')
+        with CaptureQueriesContext(connection) as large:
+            self.client.patch(
+                detail_url(recipe.id),
+                {'tags': payload_tags},
+                format='json',
+            )
+
+        self.assertEqual(len(large), len(small))
+
+    def test_tag_update_only_writes_changes(self):
+        """Test changing one tag only removes and adds that link."""
+        recipe, payload_tags = self._recipe_with_tags(3)
+        kept = Recipe.tags.through.objects.filter(
+            recipe=recipe,
+            tag__name__in=['Tag 0', 'Tag 1'],
+        )
+        kept_ids = set(kept.values_list('id', flat=True))
+
+        payload = {'tags': payload_tags[:2] + [{'name': 'New'}]}
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                detail_url(recipe.id),
+                payload,
+                format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self._through_writes(queries)), 2)
+        self.assertTrue(kept_ids.issubset(
+            Recipe.tags.through.objects.filter(
+                recipe=recipe,
+            ).values_list('id', flat=True)
+        ))
+        names = set(recipe.tags.values_list('name', flat=True))
+        self.assertEqual(names, {'Tag 0', 'Tag 1', 'New'})
+
+
+class RecipeBatchApiTests(TestCase):
+    """Test the recipe batch API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _create_op(self, title, **data):
+        """Return a create operation for a recipe."""
+        data.update({
+            'title': title,
+            'time_minutes': 10,
+            'price': '5.00',
+        })
+        return {'op': 'create', 'data': data}
+
+    def test_batch_create(self):
+        """Test creating several recipes in one batch."""
+        payload = {'operations': [
+            self._create_op('Soup', tags=[{'name': 'Lunch'}]),
+            self._create_op(
+                'Salad',
+                tags=[{'name': 'Lunch'}, {'name': 'Vegan'}],
+                ingredients=[{'name': 'Lettuce'}],
+            ),
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            [status.HTTP_201_CREATED, status.HTTP_201_CREATED],
+        )
+        salad = Recipe.objects.get(id=results[1]['data']['id'])
+        self.assertEqual(salad.user, self.user)
+        self.assertEqual(
+            set(salad.tags.values_list('name', flat=True)),
+            {'Lunch', 'Vegan'},
+        )
+        serializer = RecipeDetailSerializer(salad)
+        self.assertEqual(results[1]['data'], serializer.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_batch_reports_errors_per_item(self):
+        """Test invalid operations fail without affecting the others."""
+        other_user = create_user(email='other@example.com', password='test123')
+        other_recipe = create_recipe(user=other_user)
+        payload = {'operations': [
+            self._create_op('Soup'),
+            {'op': 'create', 'data': {'title': 'No time or price'}},
+            {'op': 'delete', 'id': other_recipe.id},
+            {'op': 'update'},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            [
+                status.HTTP_201_CREATED,
+                status.HTTP_400_BAD_REQUEST,
+                status.HTTP_404_NOT_FOUND,
+                status.HTTP_400_BAD_REQUEST,
+            ],
+        )
+        self.assertIn('time_minutes', results[1]['errors'])
+        self.assertIn('id', results[3]['errors'])
+        self.assertTrue(Recipe.objects.filter(id=other_recipe.id).exists())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_batch_update_and_delete(self):
+        """Test updating and deleting recipes in one batch."""
+        recipe1 = create_recipe(user=self.user, title='Old title')
+        recipe2 = create_recipe(user=self.user)
+        payload = {'operations': [
+            {
+                'op': 'partial_update',
+                'id': recipe1.id,
+                'data': {'title': 'New title', 'tags': [{'name': 'Dinner'}]},
+            },
+            {'op': 'delete', 'id': recipe2.id},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(results[0]['status'], status.HTTP_200_OK)
+        self.assertEqual(results[0]['data']['title'], 'New title')
+        self.assertEqual(results[1]['status'], status.HTTP_204_NO_CONTENT)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, 'New title')
+        self.assertEqual(recipe1.tags.get().name, 'Dinner')
+        self.assertFalse(Recipe.objects.filter(id=recipe2.id).exists())
+
+    def test_batch_create_query_count_constant(self):
+        """Test batch creates do not run queries per recipe."""
+        def payload(count, prefix):
+            return {'operations': [
+                self._create_op(
+                    f'{prefix} {i}',
+                    tags=[{'name': f'{prefix} tag {i}'}],
+                    ingredients=[{'name': f'{prefix} ingredient {i}'}],
+                )
+                for i in range(count)
+            ]}
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(BATCH_URL, payload(2, 'Small'), format='json')
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(
+                BATCH_URL,
+                payload(50, 'Large'),
+                format='json',
+            )
+
+        self.assertEqual(len(res.data['results']), 50)
+        self.assertEqual(len(large), len(small))
+
+    def test_batch_rejects_duplicate_ids(self):
+        """Test a batch operating twice on one recipe is rejected."""
+        recipe = create_recipe(user=self.user, title='Old title')
+        payload = {'operations': [
+            {
+                'op': 'partial_update',
+                'id': recipe.id,
+                'data': {'title': 'New title'},
+            },
+            {'op': 'delete', 'id': recipe.id},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('operations', res.data)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Old title')
+
+    def test_batch_requires_operations(self):
+        """Test an empty batch is rejected."""
+        res = self.client.post(BATCH_URL, {'operations': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class ImageUploadTests(TestCase):
@@ -433,8 +1491,43 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        storage = self.recipe.image.storage
+        for path in self.recipe.image_renditions.values():
+            storage.delete(path)
         self.recipe.image.delete()
 
+    def _upload(self, size=(10, 10), **save_kwargs):
+        """Upload a generated JPEG image to the recipe."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', size)
+            img.save(image_file, format='JPEG', **save_kwargs)
+            image_file.seek(0)
+            return self.client.post(
+                url,
+                {'image': image_file},
+                format='multipart',
+            )
+
+    def test_upload_image_locks_recipe(self):
+        """Test an upload locks the recipe and writes only image fields."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertTrue(any(
+            'FROM "core_recipe"' in query and 'FOR UPDATE' in query
+            for query in sql
+        ))
+        update = next(
+            query for query in sql if query.startswith('UPDATE "core_recipe"')
+        )
+        self.assertIn('"image" =', update)
+        self.assertIn('"version" =', update)
+        self.assertNotIn('"title" =', update)
+
     def test_upload_image(self):
         """Test uploading an image to a recipe."""
         url = image_upload_url(self.recipe.id)
@@ -457,3 +1550,196 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_RENDITIONS={
+        'SIZES': {'small': 50, 'large': 100},
+        'EAGER': True,
+    })
+    def test_upload_image_generates_renditions(self):
+        """Test resized renditions are generated after upload."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload(size=(400, 200))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        renditions = self.recipe.image_renditions
+        self.assertEqual(
+            set(renditions),
+            {'small_webp', 'small_jpg', 'large_webp', 'large_jpg'},
+        )
+        storage = self.recipe.image.storage
+        with Image.open(storage.path(renditions['small_jpg'])) as small:
+            self.assertEqual(small.size, (50, 25))
+            self.assertEqual(small.format, 'JPEG')
+        with Image.open(storage.path(renditions['large_webp'])) as large:
+            self.assertEqual(large.size, (100, 50))
+            self.assertEqual(large.format, 'WEBP')
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(
+            res.data['image_renditions']['small_jpg'].startswith('http')
+        )
+
+    @override_settings(IMAGE_RENDITIONS={
+        'SIZES': {'small': 50},
+        'EAGER': True,
+    })
+    def test_upload_image_deletes_replaced_files(self):
+        """Test re-uploading deletes the old image and renditions."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        self.recipe.refresh_from_db()
+        storage = self.recipe.image.storage
+        old_paths = [
+            self.recipe.image.name,
+            *self.recipe.image_renditions.values(),
+        ]
+        self.assertTrue(all(storage.exists(path) for path in old_paths))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertFalse(any(storage.exists(path) for path in old_paths))
+        new_paths = [
+            self.recipe.image.name,
+            *self.recipe.image_renditions.values(),
+        ]
+        self.assertEqual(len(new_paths), 3)
+        self.assertTrue(all(storage.exists(path) for path in new_paths))
+
+    def test_upload_image_defers_processing(self):
+        """Test processing is scheduled after the request commits."""
+        with patch('recipe.images.pipeline.submit') as submit:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self._upload()
+
+            submit.assert_not_called()
+            self.assertEqual(len(callbacks), 1)
+            callbacks[0]()
+
+        submit.assert_called_once_with(self.recipe.id, [])
+
+    def test_renditions_strip_metadata(self):
+        """Test renditions carry no EXIF metadata."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        source = io.BytesIO()
+        Image.new('RGB', (20, 20)).save(source, 'JPEG', exif=exif)
+        source.seek(0)
+
+        renditions = render_renditions(source, {'small': 10})
+
+        for content, _ in renditions.values():
+            with Image.open(io.BytesIO(content)) as rendition:
+                self.assertFalse(rendition.getexif())
+                self.assertNotIn('exif', rendition.info)
+
+    @override_settings(RECIPE_IMAGE_UPLOAD={'MAX_BYTES': 1024})
+    def test_upload_image_too_large(self):
+        """Test uploads over the byte limit are rejected."""
+        res = self._upload(size=(200, 200), quality=100)
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_UPLOAD={'MAX_PIXELS': 100})
+    def test_upload_image_too_many_pixels(self):
+        """Test images with too many pixels are rejected."""
+        res = self._upload(size=(20, 20))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_UPLOAD={'FORMATS': ['PNG']})
+    def test_upload_image_unsupported_format(self):
+        """Test images in formats that are not allowed are rejected."""
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    def test_upload_non_image_file(self):
+        """Test files that are not images are rejected."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            image_file.write(b'not an image' * 100)
+            image_file.seek(0)
+            res = self.client.post(
+                url,
+                {'image': image_file},
+                format='multipart',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StreamingImageUploadHandlerTests(SimpleTestCase):
+    """Tests for the streaming image upload handler."""
+
+    def _handler(self):
+        """Return a handler ready to receive a file."""
+        handler = StreamingImageUploadHandler()
+        handler.new_file('image', 'image.png', 'image/png', None)
+        return handler
+
+    @override_settings(RECIPE_IMAGE_UPLOAD={'MAX_PIXELS': 100})
+    def test_rejects_pixels_from_header(self):
+        """Test the pixel limit is enforced from the first chunk."""
+        image = io.BytesIO()
+        Image.new('RGB', (1000, 1000)).save(image, 'PNG')
+        handler = self._handler()
+
+        with self.assertRaises(ValidationError):
+            handler.receive_data_chunk(image.getvalue()[:1024], 0)
+
+    @override_settings(RECIPE_IMAGE_UPLOAD={'MAX_BYTES': 100})
+    def test_rejects_declared_length(self):
+        """Test a large Content-Length is rejected before reading."""
+        handler = StreamingImageUploadHandler()
+
+        with self.assertRaises(RequestEntityTooLarge):
+            handler.handle_raw_input(None, {}, 1000, b'')
+
+    def test_streams_to_media_root(self):
+        """Test accepted images are written to disk under MEDIA_ROOT."""
+        image = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(image, 'PNG')
+        content = image.getvalue()
+        handler = self._handler()
+
+        handler.receive_data_chunk(content, 0)
+        uploaded = handler.file_complete(len(content))
+
+        path = uploaded.temporary_file_path()
+        self.assertTrue(path.startswith(settings.MEDIA_ROOT))
+        self.assertEqual(uploaded.read(), content)
+        uploaded.close()
+        self.assertFalse(os.path.exists(path))
+
+
+class ImagePipelineTests(SimpleTestCase):
+    """Tests for the background image pipeline."""
+
+    def test_submit_runs_on_worker_thread(self):
+        """Test images are processed away from the calling thread."""
+        pipeline = ImagePipeline()
+        caller = threading.current_thread().name
+
+        with patch('recipe.images.process_recipe_image') as process:
+            process.side_effect = lambda recipe_id, stale_paths: (
+                threading.current_thread().name
+            )
+            future = pipeline.submit(1)
+            worker = future.result(timeout=5)
+        pipeline.shutdown()
+
+        self.assertNotEqual(worker, caller)
+        self.assertTrue(worker.startswith('recipe-images'))
@@ -3,9 +3,13 @@ Tests for the tags API.
 """
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import (
+    TestCase,
+    override_settings,
+)
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -15,10 +19,12 @@ from core.models import (
     Recipe,
 )
 
+from recipe.cache import get_cache
 from recipe.serializers import TagSerializer
 
 
 TAGS_URL = reverse('recipe:tag-list')
+RESPONSE_CACHE = {**settings.RESPONSE_CACHE, 'ENABLED': True}
 
 
 def detail_url(tag_id):
@@ -62,7 +68,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test list of tags is limited to authenticated user."""
@@ -73,9 +79,9 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
         """Test updating a tag."""
@@ -89,6 +95,19 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming to an existing name returns an error."""
+        Tag.objects.create(user=self.user, name='Breakfast')
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+
+        payload = {'name': 'Breakfast'}
+        url = detail_url(tag.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Lunch')
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user, name='Breakfast')
@@ -116,8 +135,8 @@ class PrivateTagsApiTests(TestCase):
 
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list."""
@@ -140,4 +159,149 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated(self):
+        """Test the tag list is split into pages by cursor."""
+        for name in ['Breakfast', 'Dinner', 'Lunch']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(names, ['Lunch', 'Dinner'])
+
+        res = self.client.get(res.data['next'])
+
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(names, ['Breakfast'])
+        self.assertIsNone(res.data['next'])
+
+    def test_retrieve_tag(self):
+        """Test retrieving a single tag."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(detail_url(tag.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, TagSerializer(tag).data)
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE)
+class TagsResponseCacheTests(TestCase):
+    """Test caching of tag API responses."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not query the database."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test a matching ETag returns 304 with no body."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+    def test_cache_invalidated_on_change(self):
+        """Test creating, renaming and deleting tags refreshes the list."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(user=self.user, name='Dinner')
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url(tag.id), {'name': 'Vegetarian'})
+        res = self.client.get(TAGS_URL)
+        names = [item['name'] for item in res.data['results']]
+        self.assertIn('Vegetarian', names)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.delete()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_invalidated_on_recipe_change(self):
+        """Test assigned_only reflects tags added to recipes."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            title='Salad',
+            time_minutes=5,
+            price=Decimal('3.00'),
+            user=self.user,
+        )
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data['results']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+    def test_cache_invalidated_on_commit(self):
+        """Test the cache version is only bumped once changes commit."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            tag.name = 'Vegetarian'
+            tag.save()
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegetarian')
+
+    def test_cache_is_per_user(self):
+        """Test users never see each other's cached responses."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        other_client = APIClient()
+        other_client.force_authenticate(create_user(email='other@example.com'))
+        res = other_client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    @override_settings(RESPONSE_CACHE={**RESPONSE_CACHE, 'ENABLED': None})
+    def test_local_cache_not_used(self):
+        """Test responses are not cached in a per-process cache."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        Tag.objects.filter(id=tag.id).update(name='Vegetarian')
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('ETag', res)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegetarian')
@@ -0,0 +1,176 @@
+"""
+Streaming upload handling for recipe images.
+"""
+import io
+import os
+import tempfile
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+
+from core.options import get_options
+from recipe.exceptions import RequestEntityTooLarge
+
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_PIXELS = 40 * 1000 * 1000
+DEFAULT_FORMATS = ['JPEG', 'PNG', 'WEBP', 'GIF']
+HEADER_LIMIT = 256 * 1024
+
+
+def read_image_header(data):
+    """Return (format, width, height) from the start of an image, or None.
+
+    Pillow only parses the header when opening, so no pixel data is
+    decoded. None means more data is needed to identify the image.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.format, image.width, image.height
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        # Pillow raises a range of errors for truncated headers.
+        return None
+
+
+class StreamedImageFile(UploadedFile):
+    """An uploaded image written to a temporary file under MEDIA_ROOT.
+
+    Keeping the file on the same filesystem as the media storage lets
+    the storage move it into place instead of copying it.
+    """
+
+    def __init__(self, name, content_type, size, charset,
+                 content_type_extra=None):
+        directory = os.path.join(settings.MEDIA_ROOT, 'uploads', 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(suffix='.upload', dir=directory)
+        super().__init__(
+            file, name, content_type, size, charset, content_type_extra,
+        )
+
+    def temporary_file_path(self):
+        """Return the full path of this file."""
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            pass
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """Upload handler that validates images while streaming them to disk.
+
+    The request is rejected as soon as it exceeds the byte limit, and as
+    soon as the image header shows an unsupported format or too many
+    pixels. At most one chunk plus the header buffer is held in memory.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        options = get_options('RECIPE_IMAGE_UPLOAD')
+        self.max_bytes = options.get('MAX_BYTES', DEFAULT_MAX_BYTES)
+        self.max_pixels = options.get('MAX_PIXELS', DEFAULT_MAX_PIXELS)
+        self.formats = options.get('FORMATS', DEFAULT_FORMATS)
+
+    def _too_large(self):
+        """Return the error for an upload over the byte limit."""
+        self.upload_interrupted()
+        return RequestEntityTooLarge(
+            _('Upload exceeds %(max)d bytes.') % {'max': self.max_bytes}
+        )
+
+    def _invalid(self, message):
+        """Return a validation error for the image field."""
+        self.upload_interrupted()
+        return ValidationError({self.field_name: [message]})
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        """Reject requests whose declared size is over the limit."""
+        if content_length and content_length > self.max_bytes:
+            raise self._too_large()
+
+    def new_file(self, *args, **kwargs):
+        """Start streaming a new file to disk."""
+        super().new_file(*args, **kwargs)
+        self.file = StreamedImageFile(
+            self.file_name,
+            self.content_type,
+            0,
+            self.charset,
+            self.content_type_extra,
+        )
+        self.header = b''
+        self.checked = False
+
+    def _check_header(self, final=False):
+        """Validate the image header once enough of it has arrived."""
+        try:
+            header = read_image_header(self.header)
+        except Image.DecompressionBombError:
+            raise self._invalid(
+                _('Image has more than %(max)d pixels.')
+                % {'max': self.max_pixels}
+            )
+        if header is None:
+            if final or len(self.header) >= HEADER_LIMIT:
+                raise self._invalid(_('Upload a valid image.'))
+            return
+
+        image_format, width, height = header
+        if image_format not in self.formats:
+            raise self._invalid(
+                _('Unsupported image format %(format)s.')
+                % {'format': image_format}
+            )
+        if width * height > self.max_pixels:
+            raise self._invalid(
+                _('Image has more than %(max)d pixels.')
+                % {'max': self.max_pixels}
+            )
+        self.checked = True
+        self.header = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        """Write a chunk to disk, validating the header on the way."""
+        if start + len(raw_data) > self.max_bytes:
+            raise self._too_large()
+
+        if not self.checked:
+            self.header += raw_data
+            self._check_header()
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        """Return the uploaded file once its header has been validated."""
+        if not self.checked:
+            self._check_header(final=True)
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+    def upload_interrupted(self):
+        """Remove the partially written file."""
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+class RecipeImageParser(MultiPartParser):
+    """Multipart parser that streams recipe images through validation."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = [StreamingImageUploadHandler(request)]
+        return super().parse(stream, media_type, parser_context)
@@ -1,6 +1,8 @@
 """
 Views for the recipe APIs
 """
+import hashlib
+
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -8,22 +10,68 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.db.models import (
+    Exists,
+    OuterRef,
+    prefetch_related_objects,
+)
+
 from rest_framework import (
     viewsets,
     mixins,
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.serializers import as_serializer_error
 
+from core.authentication import CachedTokenAuthentication
 from core.models import (
     Recipe,
     Tag,
     Ingredient,
 )
-from recipe import serializers
+from recipe import (
+    exports,
+    images,
+    serializers,
+)
+from recipe.cache import CachedResponseMixin
+from recipe.exceptions import PreconditionFailed
+from recipe.fastpath import (
+    ValuesListMixin,
+    ValuesSerializer,
+)
+from recipe.search import search_recipes
+from recipe.uploads import RecipeImageParser
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+
+
+RANGE_FIELDS = {
+    'time_minutes': OpenApiTypes.INT,
+    'price': OpenApiTypes.DECIMAL,
+}
+RANGE_LOOKUPS = {
+    'lt': 'Less than',
+    'lte': 'At most',
+    'gt': 'Greater than',
+    'gte': 'At least',
+}
+ORDERING_OPTIONS = [
+    f'{prefix}{field}'
+    for field in ('time_minutes', 'price')
+    for prefix in ('', '-')
+]
 
 
 @extend_schema_view(
@@ -39,35 +87,200 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description=(
+                    'Search titles and descriptions. Results are ordered '
+                    'by relevance.'
+                ),
+            ),
+            OpenApiParameter(
+                'match_all',
+                OpenApiTypes.INT, enum=[0, 1],
+                description=(
+                    'Only return recipes with all of the given tags and '
+                    'ingredients, instead of any of them.'
+                ),
+            ),
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description=(
+                    'Comma separated list of fields to return. Tags and '
+                    'ingredients are returned as IDs unless expanded.'
+                ),
+            ),
+            OpenApiParameter(
+                'expand',
+                OpenApiTypes.STR,
+                description=(
+                    'Comma separated list of relations (tags, ingredients) '
+                    'to return as nested objects.'
+                ),
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=ORDERING_OPTIONS,
+                description=(
+                    'Sort by a field, descending if prefixed with -. '
+                    'Defaults to newest first, or by relevance when '
+                    'searching.'
+                ),
+            ),
+        ] + [
+            OpenApiParameter(
+                f'{field}__{lookup}',
+                field_type,
+                description=f'{label} the given {field}.',
+            )
+            for field, field_type in RANGE_FIELDS.items()
+            for lookup, label in RANGE_LOOKUPS.items()
+        ] + [
+            OpenApiParameter(
+                f'{field}__range',
+                OpenApiTypes.STR,
+                description=f'Comma separated min and max {field}, inclusive.',
+            )
+            for field in RANGE_FIELDS
         ]
-    )
+    ),
+    batch=extend_schema(
+        request=serializers.RecipeBatchSerializer,
+        responses=OpenApiTypes.OBJECT,
+    ),
+    export=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'export_format',
+                OpenApiTypes.STR,
+                enum=list(exports.CONTENT_TYPES),
+                description='Format of the export. Defaults to ndjson.',
+            ),
+            OpenApiParameter(
+                'after',
+                OpenApiTypes.INT,
+                description=(
+                    'Only export recipes with a greater ID, to resume an '
+                    'interrupted export.'
+                ),
+            ),
+        ],
+        responses=OpenApiTypes.STR,
+    ),
 )
 class RecipeViewSet(viewsets.ModelViewSet):
     """View for manage recipe APIs."""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    throttle_scope = None
+    batch_chunk_size = 250
+    export_chunk_size = 2000
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _filter_related(self, queryset, through, field, ids, match_all):
+        """Filter recipes linked to any (or all) of the given ids."""
+        links = through.objects.filter(recipe=OuterRef('pk'))
+        if match_all:
+            for obj_id in set(ids):
+                queryset = queryset.filter(
+                    Exists(links.filter(**{field: obj_id}))
+                )
+            return queryset
+
+        return queryset.filter(
+            Exists(links.filter(**{f'{field}__in': ids}))
+        )
+
+    def _filter_ranges(self, queryset):
+        """Filter recipes by the numeric range query parameters."""
+        filters = {}
+        for field in RANGE_FIELDS:
+            model_field = Recipe._meta.get_field(field)
+            for lookup in [*RANGE_LOOKUPS, 'range']:
+                param = f'{field}__{lookup}'
+                value = self.request.query_params.get(param)
+                if value is None:
+                    continue
+
+                values = value.split(',') if lookup == 'range' else [value]
+                try:
+                    values = [model_field.to_python(v) for v in values]
+                except DjangoValidationError as exc:
+                    raise ValidationError({param: exc.messages})
+                if lookup == 'range' and len(values) != 2:
+                    raise ValidationError(
+                        {param: ['Enter a minimum and maximum.']}
+                    )
+                filters[param] = values if lookup == 'range' else values[0]
+
+        return queryset.filter(**filters)
+
     def get_queryset(self):
         """Retrieve recipes for authenticated user."""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match_all = self.request.query_params.get('match_all', '0')
+        if match_all not in ('0', '1'):
+            raise ValidationError(
+                {'match_all': [f'Invalid match_all {match_all!r}.']}
+            )
+        match_all = match_all == '1'
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_related(
+                queryset, Recipe.tags.through, 'tag', tag_ids, match_all,
+            )
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = self._filter_related(
+                queryset,
+                Recipe.ingredients.through,
+                'ingredient',
+                ingredient_ids,
+                match_all,
+            )
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-id').distinct()
+        queryset = self._filter_ranges(
+            queryset.filter(user=self.request.user)
+        )
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
+
+        queryset = queryset.order_by(*self.get_ordering())
+        if self.action in ('update', 'partial_update', 'upload_image'):
+            queryset = queryset.select_for_update()
+
+        return queryset
+
+    def get_ordering(self):
+        """Return the ordering of recipes for this request.
+
+        Sort fields are followed by the id in the same direction, so that
+        the composite indexes can serve either direction.
+        """
+        ordering = self.request.query_params.get('ordering')
+        if ordering:
+            if ordering not in ORDERING_OPTIONS:
+                raise ValidationError(
+                    {'ordering': [f'Invalid ordering {ordering!r}.']}
+                )
+            prefix = '-' if ordering.startswith('-') else ''
+            return (ordering, f'{prefix}id')
+
+        if self.request.query_params.get('search'):
+            return ('-rank', '-id')
+
+        return ('-id',)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -75,6 +288,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'batch':
+            return serializers.RecipeBatchSerializer
 
         return self.serializer_class
 
@@ -82,18 +297,290 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe."""
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    def _recipe_etag(self, recipe):
+        """Return the strong ETag for a recipe."""
+        return f'"{recipe.id}-{recipe.version}"'
+
+    def _with_validators(self, response, recipe):
+        """Add ETag and Last-Modified headers for a recipe."""
+        response['ETag'] = self._recipe_etag(recipe)
+        response['Last-Modified'] = http_date(recipe.updated_at.timestamp())
+        return response
+
+    def get_object(self):
+        """Return the recipe, enforcing preconditions on updates."""
+        recipe = super().get_object()
+        if self.action in ('update', 'partial_update'):
+            not_modified = get_conditional_response(
+                self.request,
+                etag=self._recipe_etag(recipe),
+                last_modified=int(recipe.updated_at.timestamp()),
+            )
+            if not_modified is not None:
+                raise PreconditionFailed()
+
+        return recipe
+
+    def _param_list(self, name, choices):
+        """Return a comma separated query parameter as a list, or None."""
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+
+        names = [item for item in value.split(',') if item]
+        invalid = [item for item in names if item not in choices]
+        if invalid:
+            raise ValidationError(
+                {name: [f'Invalid field {item!r}.' for item in invalid]}
+            )
+
+        return names
+
+    def _sparse_fieldset(self):
+        """Return the fields and expanded relations to list.
+
+        Without fields or expand parameters, every field is returned
+        with nested relations.
+        """
+        relations = serializers.RecipeSerializer.relations
+        fields = self._param_list(
+            'fields',
+            serializers.RecipeSerializer.Meta.fields,
+        )
+        expand = self._param_list('expand', relations)
+        if fields is None and expand is None:
+            return serializers.RecipeSerializer.Meta.fields, relations
+
+        if fields is None:
+            fields = serializers.RecipeSerializer.Meta.fields
+        expand = expand or []
+
+        return list(dict.fromkeys([*fields, *expand])), expand
+
+    def _project(self, queryset, serializer):
+        """Return rows with the columns needed to list recipes."""
+        ordering = [name.lstrip('-') for name in self.get_ordering()]
+        columns = dict.fromkeys(
+            ['id', 'version', *ordering, *serializer.columns]
+        )
+        return queryset.values(*columns)
+
+    def list(self, request, *args, **kwargs):
+        """List recipes, answering 304 if the page is unchanged."""
+        fields, expand = self._sparse_fieldset()
+        serializer = ValuesSerializer(
+            self.get_serializer(fields=fields, expand=expand)
+        )
+        queryset = self._project(
+            self.filter_queryset(self.get_queryset()),
+            serializer,
+        )
+        page = self.paginate_queryset(queryset)
+        state = ','.join(
+            [request.build_absolute_uri()]
+            + [f'{recipe["id"]}-{recipe["version"]}' for recipe in page]
+            + [
+                self.paginator.get_next_link() or '',
+                self.paginator.get_previous_link() or '',
+            ]
+        )
+        etag = f'"{hashlib.md5(state.encode()).hexdigest()}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+        response = self.get_paginated_response(serializer.serialize(page))
+        response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return a recipe, answering 304 if the client copy is current."""
+        recipe = self.get_object()
+        response = get_conditional_response(
+            request,
+            etag=self._recipe_etag(recipe),
+            last_modified=int(recipe.updated_at.timestamp()),
+        )
+        if response is None:
+            serializer = self.get_serializer(recipe)
+            response = Response(serializer.data)
+
+        return self._with_validators(response, recipe)
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        """Update a recipe, honouring If-Match preconditions."""
+        partial = kwargs.pop('partial', False)
+        recipe = self.get_object()
+        serializer = self.get_serializer(
+            recipe,
+            data=request.data,
+            partial=partial,
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        return self._with_validators(Response(serializer.data), recipe)
+
+    @action(
+        methods=['POST'],
+        detail=True,
+        url_path='upload-image',
+        parser_classes=[RecipeImageParser],
+        throttle_scope='upload',
+    )
+    @transaction.atomic
     def upload_image(self, request, pk=None):
-        """Upload an image to recipe."""
+        """Upload an image to recipe, holding a lock on its row."""
         recipe = self.get_object()
+        stale_paths = list(recipe.image_renditions.values())
+        if recipe.image:
+            stale_paths.append(recipe.image.name)
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(image_renditions={})
+            images.pipeline.schedule(recipe.id, [
+                path for path in stale_paths if path != recipe.image.name
+            ])
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _run_batch_chunk(self, operations):
+        """Apply one chunk of batch operations and return their results."""
+        context = self.get_serializer_context()
+        results = [None] * len(operations)
+        ops = [
+            serializers.RecipeBatchOperationSerializer(data=op)
+            for op in operations
+        ]
+        ids = {op.validated_data.get('id') for op in ops if op.is_valid()}
+        recipes = Recipe.objects.filter(
+            user=self.request.user,
+        ).select_for_update().in_bulk(ids - {None})
+
+        creates, updates, delete_ids = [], [], set()
+        validator = serializers.RecipeDetailSerializer(context=context)
+        for index, op in enumerate(ops):
+            if op.errors:
+                results[index] = {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': op.errors,
+                }
+                continue
+
+            kind = op.validated_data['op']
+            data = op.validated_data['data']
+            recipe = recipes.get(op.validated_data.get('id'))
+            if kind == 'create':
+                try:
+                    creates.append((index, validator.run_validation(data)))
+                except ValidationError as exc:
+                    results[index] = {
+                        'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': as_serializer_error(exc),
+                    }
+            elif recipe is None:
+                results[index] = {
+                    'status': status.HTTP_404_NOT_FOUND,
+                    'errors': {'detail': 'Not found.'},
+                }
+            elif kind == 'delete':
+                delete_ids.add(recipe.id)
+                results[index] = {'status': status.HTTP_204_NO_CONTENT}
+            else:
+                serializer = serializers.RecipeDetailSerializer(
+                    recipe,
+                    data=data,
+                    partial=kind == 'partial_update',
+                    context=context,
+                )
+                if serializer.is_valid():
+                    serializer.save()
+                    updates.append((index, recipe))
+                else:
+                    results[index] = {
+                        'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': serializer.errors,
+                    }
+
+        created = serializers.RecipeDetailSerializer(
+            many=True,
+            context=context,
+        ).create([validated_data for _, validated_data in creates])
+        Recipe.objects.filter(id__in=delete_ids).delete()
+
+        saved = [
+            (index, recipe, status.HTTP_201_CREATED)
+            for (index, _), recipe in zip(creates, created)
+        ] + [
+            (index, recipe, status.HTTP_200_OK)
+            for index, recipe in updates
+        ]
+        saved_recipes = [recipe for _, recipe, _ in saved]
+        prefetch_related_objects(saved_recipes, 'tags', 'ingredients')
+        data = serializers.RecipeDetailSerializer(
+            saved_recipes,
+            many=True,
+            context=context,
+        ).data
+        for (index, _, code), recipe_data in zip(saved, data):
+            results[index] = {'status': code, 'data': recipe_data}
+
+        return results
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream all of the user's recipes in id order."""
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in exports.CONTENT_TYPES:
+            raise ValidationError(
+                {'export_format': [f'Invalid format {export_format!r}.']}
+            )
+        after = request.query_params.get('after')
+        if after is not None:
+            try:
+                after = int(after)
+            except ValueError:
+                raise ValidationError({'after': ['Enter a valid integer.']})
+
+        serializer = ValuesSerializer(
+            serializers.RecipeDetailSerializer(
+                context=self.get_serializer_context(),
+            )
+        )
+        response = StreamingHttpResponse(
+            exports.iter_export(
+                Recipe.objects.filter(user=request.user),
+                serializer,
+                export_format,
+                after=after,
+                chunk_size=self.export_chunk_size,
+            ),
+            content_type=exports.CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
+
+    @action(methods=['POST'], detail=False, url_path='batch')
+    def batch(self, request):
+        """Create, update and delete many recipes in one request."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
+        results = []
+        for start in range(0, len(operations), self.batch_chunk_size):
+            with transaction.atomic():
+                results.extend(self._run_batch_chunk(
+                    operations[start:start + self.batch_chunk_size]
+                ))
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -106,13 +593,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(CachedResponseMixin,
+                            ValuesListMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
+                            mixins.RetrieveModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
@@ -121,11 +612,15 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            model = queryset.model
+            links = model.recipe_set.through.objects.filter(
+                **{model._meta.model_name: OuterRef('pk')}
+            )
+            queryset = queryset.filter(Exists(links))
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by('-name')
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -9,6 +9,8 @@ from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from core.models import AuthToken
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -23,15 +25,26 @@ class UserSerializer(serializers.ModelSerializer):
         return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        """Update and return user."""
+        """Update and return user, saving only the fields that changed.
+
+        The password is hashed only when a new one is given. Saving the
+        user evicts its cached tokens.
+        """
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
+        update_fields = []
+        for field, value in validated_data.items():
+            if getattr(instance, field) != value:
+                setattr(instance, field, value)
+                update_fields.append(field)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+            update_fields.append('password')
 
-        return user
+        if update_fields:
+            instance.save(update_fields=update_fields)
+
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -57,3 +70,13 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class TokenSerializer(serializers.ModelSerializer):
+    """Serializer for an issued auth token."""
+    token = serializers.CharField(source='key', read_only=True)
+
+    class Meta:
+        model = AuthToken
+        fields = ['token', 'expires']
+        read_only_fields = fields
@@ -1,16 +1,25 @@
 """
 Tests for the user API.
 """
+from datetime import timedelta
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import AuthToken
+from core.throttling import throttle_store
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+ROTATE_TOKEN_URL = reverse('user:token-rotate')
 ME_URL = reverse('user:me')
 
 
@@ -23,6 +32,8 @@ class PublicUserApiTests(TestCase):
     """Test the public features of the user API."""
 
     def setUp(self):
+        throttle_store.clear()
+        caches['default'].clear()
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -83,6 +94,23 @@ class PublicUserApiTests(TestCase):
 
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        token = AuthToken.objects.get(key=res.data['token'])
+        self.assertGreater(token.expires, timezone.now())
+        self.assertIn('expires', res.data)
+
+    def test_create_token_rehashes_legacy_password(self):
+        """Test logging in rehashes a password with the preferred hasher."""
+        user = create_user(email='test@example.com')
+        user.password = make_password('test-pass123', hasher='pbkdf2_sha256')
+        user.save()
+
+        payload = {'email': 'test@example.com', 'password': 'test-pass123'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password('test-pass123'))
 
     def test_create_token_bad_credentials(self):
         """Test returns error if credentials invalid."""
@@ -110,6 +138,31 @@ class PublicUserApiTests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_rotate_token(self):
+        """Test rotating issues a new token and expires the old one."""
+        user = create_user(email='test@example.com', password='pass123')
+        token = AuthToken.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.post(ROTATE_TOKEN_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], token.key)
+        self.assertTrue(
+            AuthToken.objects.filter(key=res.data['token'], user=user).exists()
+        )
+        token.refresh_from_db()
+        self.assertLessEqual(
+            token.expires,
+            timezone.now() + timedelta(seconds=60),
+        )
+
+    def test_rotate_token_unauthorized(self):
+        """Test rotating requires a token."""
+        res = self.client.post(ROTATE_TOKEN_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_retrieve_user_unauthorized(self):
         """Test authentication is required for users."""
         res = self.client.get(ME_URL)
@@ -155,3 +208,42 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_user_profile_saves_changed_fields(self):
+        """Test an update writes only the changed fields in one query.
+
+        The other query finds the user's tokens to evict from the cache.
+        """
+        password = self.user.password
+
+        with self.assertNumQueries(2):
+            res = self.client.patch(ME_URL, {'name': 'Updated name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Updated name')
+        self.assertEqual(self.user.password, password)
+
+    def test_update_user_profile_unchanged(self):
+        """Test an update with unchanged values does not save."""
+        with self.assertNumQueries(0):
+            res = self.client.patch(ME_URL, {'name': self.user.name})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_password_saves_once(self):
+        """Test changing the password and name saves the user once."""
+        payload = {'name': 'Updated name', 'password': 'newpassword123'}
+
+        with patch.object(
+            get_user_model(),
+            'set_password',
+            autospec=True,
+            side_effect=get_user_model().set_password,
+        ) as set_password, self.assertNumQueries(2):
+            res = self.client.patch(ME_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        set_password.assert_called_once()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password(payload['password']))
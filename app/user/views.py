@@ -1,13 +1,16 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
-from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.settings import api_settings
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
+from core.models import AuthToken
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
+    TokenSerializer,
 )
 
 
@@ -16,16 +19,41 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(generics.GenericAPIView):
     """Create a new auth token for user."""
     serializer_class = AuthTokenSerializer
-    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_scope = 'login'
+
+    @extend_schema(responses={status.HTTP_200_OK: TokenSerializer})
+    def post(self, request, *args, **kwargs):
+        """Issue a token for valid credentials."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = AuthToken.objects.create(
+            user=serializer.validated_data['user'],
+        )
+
+        return Response(TokenSerializer(token).data)
+
+
+class RotateTokenView(generics.GenericAPIView):
+    """Replace the token used to authenticate with a new one."""
+    serializer_class = TokenSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None)
+    def post(self, request, *args, **kwargs):
+        """Issue a new token and expire the current one."""
+        token = AuthToken.objects.rotate(request.auth)
+
+        return Response(self.get_serializer(token).data)
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -2,5 +2,12 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+if [ "${SERVER_MODE:-uwsgi}" = "asgi" ]; then
+    template=/etc/nginx/asgi.conf.tpl
+else
+    template=/etc/nginx/default.conf.tpl
+fi
+
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT}' \
+    < "$template" > /etc/nginx/conf.d/default.conf
 nginx -g 'daemon off;'
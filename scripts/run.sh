@@ -6,4 +6,17 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+# Counts left by workers of an earlier run would be added to this one's.
+if [ -n "${METRICS_DIRECTORY}" ]; then
+    rm -f "${METRICS_DIRECTORY}"/metrics-*.json
+fi
+
+if [ "${SERVER_MODE:-uwsgi}" = "asgi" ]; then
+    gunicorn app.asgi:application \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --workers "${WORKERS:-4}" \
+        --bind :9000
+else
+    uwsgi --socket :9000 --workers "${WORKERS:-4}" --master --enable-threads \
+        --module app.wsgi
+fi